@@ -0,0 +1,210 @@
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+AUTH_PATH = "/api/v2/oauth"
+COMPLETIONS_PATH = "/api/v1/chat/completions"
+TOKEN_LIFETIME = 30 * 60
+
+
+class FakeGigaChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.5, jitter: float = 0.0,
+                 auth_latency: float = 0.1, error_rate: float = 0.0, rate_limit: float = 0.0, seed: Optional[int] = None):
+        super().__init__((host, port), FakeGigaChatHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.auth_latency = auth_latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.tokens = set()
+        self.stats = {'auth': 0, 'completions': 0, 'errors': 0, 'rate_limited': 0, 'unauthorized': 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._capacity = max(1.0, rate_limit)
+        self._allowance = self._capacity
+        self._last_check = time.monotonic()
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def auth_url(self) -> str:
+        return self.base_url + AUTH_PATH
+    
+    @property
+    def api_url(self) -> str:
+        return self.base_url + COMPLETIONS_PATH
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-gigachat", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+    
+    def count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+    
+    def reset_stats(self):
+        with self._lock:
+            for name in self.stats:
+                self.stats[name] = 0
+    
+    def acquire(self) -> bool:
+        if self.rate_limit <= 0:
+            return True
+        
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self._capacity, self._allowance + (now - self._last_check) * self.rate_limit)
+            self._last_check = now
+            if self._allowance < 1:
+                return False
+            self._allowance -= 1
+            return True
+    
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+    
+    def delay(self) -> float:
+        with self._lock:
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+
+class FakeGigaChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send(200, dict(self.server.stats))
+        else:
+            self._send(404, {'message': 'Not found'})
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        
+        if self.path == AUTH_PATH:
+            self._handle_auth()
+        elif self.path == COMPLETIONS_PATH:
+            self._handle_completion(body)
+        else:
+            self._send(404, {'message': 'Not found'})
+    
+    def _handle_auth(self):
+        server = self.server
+        server.count('auth')
+        time.sleep(server.auth_latency)
+        
+        if not self.headers.get('Authorization', '').startswith('Basic '):
+            server.count('unauthorized')
+            self._send(401, {'message': 'Authorization required'})
+            return
+        
+        token = uuid.uuid4().hex
+        with server._lock:
+            server.tokens.add(token)
+        self._send(200, {'access_token': token, 'expires_at': int((time.time() + TOKEN_LIFETIME) * 1000)})
+    
+    def _handle_completion(self, body: bytes):
+        server = self.server
+        server.count('completions')
+        
+        token = self.headers.get('Authorization', '').replace('Bearer ', '', 1)
+        if token not in server.tokens:
+            server.count('unauthorized')
+            self._send(401, {'message': 'Token is invalid'})
+            return
+        
+        if not server.acquire():
+            server.count('rate_limited')
+            self._send(429, {'message': 'Too many requests'})
+            return
+        
+        time.sleep(server.delay())
+        
+        if server.should_fail():
+            server.count('errors')
+            self._send(500, {'message': 'Internal error'})
+            return
+        
+        try:
+            payload = json.loads(body)
+            prompt = payload['messages'][-1]['content']
+        except (ValueError, KeyError, IndexError):
+            self._send(400, {'message': 'Bad request'})
+            return
+        
+        self._send(200, {
+            'choices': [{'message': {'role': 'assistant', 'content': self._answer(prompt)}, 'index': 0,
+                         'finish_reason': 'stop'}],
+            'model': payload.get('model', 'GigaChat'),
+            'object': 'chat.completion'
+        })
+    
+    def _answer(self, prompt: str) -> str:
+        header = [line for line in prompt.splitlines() if line.startswith(('КАТЕГОРИЯ', 'КОЛИЧЕСТВО'))][:2]
+        return "\n".join(header + [
+            "",
+            "ОСНОВНЫЕ ПРИЧИНЫ ОШИБКИ",
+            "Ответ тестового сервера.",
+            "",
+            "РЕШЕНИЯ ДЛЯ ИСПРАВЛЕНИЯ",
+            "1. Ответ тестового сервера.",
+            "",
+            "ОБЩИЕ РЕКОМЕНДАЦИИ",
+            "1. Ответ тестового сервера."
+        ])
+    
+    def _send(self, status: int, payload: Dict):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная заглушка GigaChat API")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.5, help="задержка ответа, секунд")
+    parser.add_argument('--jitter', type=float, default=0.0, help="разброс задержки, секунд")
+    parser.add_argument('--auth-latency', type=float, default=0.1, help="задержка выдачи токена, секунд")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="доля ответов с ошибкой 500")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="запросов в секунду, 0 - без ограничения")
+    args = parser.parse_args()
+    
+    server = FakeGigaChatServer(args.host, args.port, args.latency, args.jitter, args.auth_latency,
+                                args.error_rate, args.rate_limit)
+    print(f"Заглушка GigaChat запущена: {server.base_url}")
+    print(f"    GIGACHAT_AUTH_URL={server.auth_url}")
+    print(f"    GIGACHAT_API_URL={server.api_url}")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,67 @@
-import requests
 import os
 import json
+import time
 import uuid
-from typing import List
+import threading
+from typing import Dict, List
+from .response_cache import ResponseCache
+from instrumentation import metrics
+
+TOKEN_REFRESH_MARGIN = 60
+DEFAULT_TOKEN_LIFETIME = 30 * 60
 
 class GigaChatGenerator:
+    _session = None
+    _session_lock = threading.Lock()
+    _tokens = {}
+    _token_lock = threading.Lock()
+    
     def __init__(self):
-        self.auth_url = "https://ngw.devices.sberbank.ru:9443/api/v2/oauth"
-        self.api_url = "https://gigachat.devices.sberbank.ru/api/v1/chat/completions"
+        self.auth_url = os.getenv('GIGACHAT_AUTH_URL', "https://ngw.devices.sberbank.ru:9443/api/v2/oauth")
+        self.api_url = os.getenv('GIGACHAT_API_URL', "https://gigachat.devices.sberbank.ru/api/v1/chat/completions")
         self.credentials = os.getenv('GIGACHAT_CREDENTIALS')
+        self.cache = ResponseCache()
         
         if not self.credentials:
             print("GigaChat: Не найден GIGACHAT_CREDENTIALS в .env файле")
         else:
             print(f"GigaChat: Ключ длиной {len(self.credentials)} символов")
+    
+    @classmethod
+    def _get_session(cls) -> 'requests.Session':
+        with cls._session_lock:
+            if cls._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                
+                pool_size = int(os.getenv('AI_MAX_CONCURRENCY', '4'))
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(pool_size, 1))
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.verify = False
+                cls._session = session
+            return cls._session
+    
+    def _get_cached_token(self):
+        key = (self.auth_url, self.credentials)
         
+        with self._token_lock:
+            token, expires_at = self._tokens.get(key, (None, 0))
+            if token and time.time() < expires_at - TOKEN_REFRESH_MARGIN:
+                return token
+            
+            token, expires_at = self._get_access_token()
+            if token:
+                self._tokens[key] = (token, expires_at)
+            return token
+    
+    def _invalidate_token(self, token):
+        key = (self.auth_url, self.credentials)
+        with self._token_lock:
+            if self._tokens.get(key, (None, 0))[0] == token:
+                del self._tokens[key]
+    
     def _get_access_token(self):
         try:
             rquid = str(uuid.uuid4())
@@ -29,11 +76,11 @@ class GigaChatGenerator:
             data = {'scope': 'GIGACHAT_API_PERS'}
             
             print("GigaChat: Получение токена...")
-            response = requests.post(
+            metrics.count('llm_token_requests')
+            response = self._get_session().post(
                 self.auth_url, 
                 headers=headers, 
                 data=data, 
-                verify=False,
                 timeout=30
             )
             
@@ -42,23 +89,39 @@ class GigaChatGenerator:
             if response.status_code == 200:
                 token_data = response.json()
                 token = token_data['access_token']
-                expires_in = token_data.get('expires_in', 'N/A')
-                print(f"GigaChat: Токен получен! Действует {expires_in} секунд")
-                return token
+                expires_at = self._token_expiry(token_data)
+                print(f"GigaChat: Токен получен! Действует {int(expires_at - time.time())} секунд")
+                return token, expires_at
             else:
                 print(f"GigaChat Auth Error: {response.status_code}")
                 print(f"Response: {response.text}")
-                return None
+                return None, 0
                 
         except Exception as e:
             print(f"GigaChat Auth Exception: {e}")
-            return None
+            return None, 0
+    
+    def _token_expiry(self, token_data) -> float:
+        if 'expires_in' in token_data:
+            return time.time() + float(token_data['expires_in'])
+        if 'expires_at' in token_data:
+            expires_at = float(token_data['expires_at'])
+            return expires_at / 1000 if expires_at > 1e11 else expires_at
+        return time.time() + DEFAULT_TOKEN_LIFETIME
     
     def generate_script(self, category: str, count: int, total_errors: int, examples: List[str]) -> str:
         if not self.credentials:
             return self._get_fallback_solution(category, count, total_errors, examples)
         
-        token = self._get_access_token()
+        data = self._build_request(category, count, total_errors, examples)
+        cache_key = self._cache_key(data)
+        cached_response = self.cache.get(cache_key)
+        if cached_response is not None:
+            metrics.count('llm_cache_hits')
+            print(f"GigaChat: Решение для '{category}' взято из кэша")
+            return cached_response
+        
+        token = self._get_cached_token()
         if not token:
             return self._get_fallback_solution(category, count, total_errors, examples)
         
@@ -69,52 +132,62 @@ class GigaChatGenerator:
                 'Accept': 'application/json'
             }
             
-            prompt = self._build_prompt(category, count, total_errors, examples)
-            
-            data = {
-                "model": "GigaChat",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": (
-                            "Ты аналитик в телеком-компании. Анализируй ошибки робота в колл-центре. "
-                            "Давай практические рекомендации как уменьшить количество ошибок. "
-                            "Говори просто и понятно. Строго следуй формату ответа."
-                        )
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.7,
-                "max_tokens": 1500
-            }
-            
             print(f"GigaChat: Генерация решения для '{category}'...")
             
-            response = requests.post(
-                self.api_url, 
-                headers=headers, 
-                json=data, 
-                verify=False,
-                timeout=30
-            )
+            metrics.count('llm_requests')
+            with metrics.stage('llm_call', profile=False):
+                response = self._get_session().post(
+                    self.api_url, 
+                    headers=headers, 
+                    json=data, 
+                    timeout=30
+                )
             
             if response.status_code == 200:
                 result = response.json()
                 ai_response = result['choices'][0]['message']['content']
                 print(f"GigaChat: Решение сгенерировано!")
+                self.cache.put(cache_key, ai_response)
                 return ai_response
             else:
+                if response.status_code == 401:
+                    self._invalidate_token(token)
+                metrics.count('llm_errors')
                 error_msg = f"GigaChat API Error: {response.status_code}"
                 print(error_msg)
                 return self._get_fallback_solution(category, count, total_errors, examples)
                 
         except Exception as e:
+            metrics.count('llm_errors')
             error_msg = f"GigaChat Exception: {e}"
             print(error_msg)
             return self._get_fallback_solution(category, count, total_errors, examples)
+    
+    def _cache_key(self, data: Dict) -> str:
+        return self.cache.make_key({'api_url': self.api_url, 'model': data.get('model'), 'request': data})
+    
+    def _build_request(self, category: str, count: int, total_errors: int, examples: List[str]) -> Dict:
+        prompt = self._build_prompt(category, count, total_errors, examples)
+        
+        return {
+            "model": "GigaChat",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": (
+                        "Ты аналитик в телеком-компании. Анализируй ошибки робота в колл-центре. "
+                        "Давай практические рекомендации как уменьшить количество ошибок. "
+                        "Говори просто и понятно. Строго следуй формату ответа."
+                    )
+                },
+                {
+                    "role": "user", 
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.7,
+            "max_tokens": 1500
+        }
 
     def _build_prompt(self, category: str, count: int, total_errors: int, examples: List[str]) -> str:
         examples_text = "\n".join([f"ДИАЛОГ {i+1}:\n{ex}\n" for i, ex in enumerate(examples)])
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+class ResponseCache:
+    def __init__(self, cache_dir: Optional[str] = None, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or os.getenv('AI_CACHE_DIR', '.cache/gigachat')
+        self.ttl = float(ttl if ttl is not None else os.getenv('AI_CACHE_TTL', 24 * 60 * 60))
+        self.max_bytes = int(max_bytes if max_bytes is not None else os.getenv('AI_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+        self.enabled = self.ttl > 0 and self.max_bytes > 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = None
+        self._created = deque()
+        self._bytes = 0
+    
+    @staticmethod
+    def make_key(payload: Dict) -> str:
+        serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                size = os.fstat(f.fileno()).st_size
+                entry = json.load(f)
+            created = entry['created']
+        except (OSError, ValueError, KeyError):
+            entry = None
+        
+        with self._lock:
+            if entry is not None and time.time() - created > self.ttl:
+                self._forget(key)
+                self._remove(path)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._track(key, created, size)
+        return entry['response']
+    
+    def put(self, key: str, response: str):
+        if not self.enabled:
+            return
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            created = time.time()
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'created': created, 'response': response}, f, ensure_ascii=False)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, path)
+            with self._lock:
+                self._track(key, created, size)
+                self._evict()
+        except OSError as e:
+            print(f"Кэш ответов: не удалось сохранить ответ ({e})")
+    
+    def _load_entries(self):
+        if self._entries is not None:
+            return self._entries
+        
+        found = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            names = []
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    size = os.fstat(f.fileno()).st_size
+                    created = json.load(f)['created']
+                last_used = os.stat(path).st_mtime
+            except (OSError, ValueError, KeyError):
+                self._remove(path)
+                continue
+            found.append((last_used, name[:-len('.json')], created, size))
+        
+        self._entries = OrderedDict()
+        for _, key, created, size in sorted(found):
+            self._entries[key] = (created, size)
+            self._bytes += size
+        self._created = deque(sorted((created, key) for key, (created, _) in self._entries.items()))
+        return self._entries
+    
+    def _track(self, key: str, created: float, size: int):
+        entries = self._load_entries()
+        previous = entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        if previous is None or previous[0] != created:
+            self._created.append((created, key))
+        entries[key] = (created, size)
+        self._bytes += size
+    
+    def _forget(self, key: str):
+        entries = self._load_entries()
+        previous = entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+    
+    def _evict(self):
+        entries = self._load_entries()
+        expires = time.time() - self.ttl
+        while self._created and self._created[0][0] < expires:
+            created, key = self._created.popleft()
+            if key in entries and entries[key][0] == created:
+                self._forget(key)
+                self._remove(self._path(key))
+        
+        while self._bytes > self.max_bytes and entries:
+            key = next(iter(entries))
+            self._forget(key)
+            self._remove(self._path(key))
+    
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
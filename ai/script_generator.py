@@ -2,19 +2,23 @@ import pandas as pd
 import re
 from typing import Dict, List
 import os
-from .gigachat_generator import GigaChatGenerator
+from concurrent.futures import ThreadPoolExecutor
+from parsed_dialog import ParsedDialog
 
 class ScriptGenerator:
     
     def __init__(self):
         self.ai_enabled = os.getenv('AI_ENABLED', 'true').lower() == 'true'
         self.ai_provider = os.getenv('AI_PROVIDER', 'gigachat')
+        self.max_concurrency = int(os.getenv('AI_MAX_CONCURRENCY', '4'))
         self.ai_generator = None
         self._scripts_generated = False
     
     def _initialize_ai(self):
         if self.ai_generator is None and self.ai_enabled and self.ai_provider == 'gigachat':
             try:
+                from .gigachat_generator import GigaChatGenerator
+                
                 self.ai_generator = GigaChatGenerator()
                 print("Настоящий ИИ (GigaChat) активирован!")
             except Exception as e:
@@ -37,8 +41,14 @@ class ScriptGenerator:
         
         category_stats = errors_df['Категория ошибки'].value_counts()
         
+        cache = self.ai_generator.cache if recommendation_type == "ai" and self.ai_generator else None
+        cache_hits = cache.hits if cache else 0
+        
         solutions = self._generate_category_solutions(category_stats, errors_df, recommendation_type)
         
+        if cache:
+            print(f"Из кэша ответов: {cache.hits - cache_hits} из {len(solutions)} категорий")
+        
         self._save_solutions_to_file(solutions, len(errors_df), recommendation_type)
         
         print(f"Рекомендации ({recommendation_type}) сгенерированы!")
@@ -46,36 +56,46 @@ class ScriptGenerator:
         return True
 
     def _generate_category_solutions(self, category_stats, errors_df, recommendation_type) -> List[Dict]:
-        solutions = []
+        tasks = [(category, count, self._get_category_examples(errors_df, category))
+                 for category, count in category_stats.items()]
         
-        for category, count in category_stats.items():
-            examples = self._get_category_examples(errors_df, category)
+        workers = min(self.max_concurrency, len(tasks))
+        if recommendation_type != "ai" or self.ai_generator is None or workers <= 1:
+            return [self._create_solution(recommendation_type, *task) for task in tasks]
             
-            if recommendation_type == "ai":
-                solution = self._create_ai_solution(category, count, examples)
-            else:
-                solution = self._create_statistics_only(category, count, examples)
-                
-            solutions.append(solution)
+        print(f"Параллельная генерация рекомендаций: до {workers} запросов одновременно")
         
-        return solutions
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recommendations") as executor:
+            futures = [executor.submit(self._create_solution, recommendation_type, *task) for task in tasks]
+            return [future.result() for future in futures]
+    
+    def _create_solution(self, recommendation_type: str, category: str, count: int, examples: List[str]) -> Dict:
+        if recommendation_type != "ai":
+            return self._create_statistics_only(category, count, examples)
+        
+        try:
+            return self._create_ai_solution(category, count, examples)
+        except Exception as e:
+            print(f"Ошибка генерации рекомендаций для '{category}': {e}")
+            return self._create_fallback_solution(category, count, examples)
 
     def _get_category_examples(self, errors_df, category, max_examples=2):
         category_errors = errors_df[errors_df['Категория ошибки'] == category]
         examples = []
         
         for _, row in category_errors.head(max_examples).iterrows():
-            transcript = str(row['call_transcript'])
-            excerpt = self._extract_dialog_excerpt(transcript)
+            dialog = ParsedDialog(str(row['call_transcript']))
+            excerpt = self._extract_dialog_excerpt(dialog)
             if excerpt:
                 examples.append(excerpt)
         
         return examples
 
-    def _extract_dialog_excerpt(self, transcript: str) -> str:
-        lines = [line.strip() for line in transcript.split(';') if line.strip()]
+    def _extract_dialog_excerpt(self, dialog: ParsedDialog) -> str:
+        lines = dialog.non_empty_turns()
         if len(lines) >= 2:
             return '\n'.join(lines[-2:])
+        transcript = dialog.transcript
         return transcript[:200] + '...' if len(transcript) > 200 else transcript
 
     def _create_ai_solution(self, category: str, count: int, examples: List[str]) -> Dict:
@@ -85,6 +105,11 @@ class ScriptGenerator:
         else:
             print(f"AI недоступен, рекомендации не сгенерированы для категории '{category}'")
             return self._create_statistics_only(category, count, examples)
+    
+    def _create_fallback_solution(self, category: str, count: int, examples: List[str]) -> Dict:
+        if self.ai_generator:
+            return {'category': category, 'solution': self.ai_generator._get_fallback_solution(category, count, count, examples)}
+        return self._create_statistics_only(category, count, examples)
 
     def _create_statistics_only(self, category: str, count: int, examples: List[str]) -> Dict:
         solution = f"""
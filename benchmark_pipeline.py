@@ -0,0 +1,350 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from config import FINAL_RESULTS_FILE, LAZY_MODULES, STARTUP_BUDGET_SECONDS, COMPACT_FRAMES, EXCEL_MAX_ROWS
+from dialog_reader import iter_dialog_chunks
+from error_categorizer import ErrorCategorizer
+from improved_analyzer import DoubleCheckAnalyzer
+from input_cache import read_dialogs
+from instrumentation import metrics
+from output_writers import OutputWriter
+from status_corrector import StatusCorrector
+from synthetic_data import write_dialogs
+
+STAGES = ['load', 'first_pass_analysis', 'categorize_errors', 'correction', 'create_corrected_dialogs_file',
+          'charts', 'excel_export']
+
+
+def current_rss():
+    try:
+        import psutil
+    except ImportError:
+        return _proc_rss(os.getpid())
+    
+    process = psutil.Process()
+    rss = process.memory_info().rss
+    for child in process.children(recursive=True):
+        with contextlib.suppress(psutil.Error):
+            rss += child.memory_info().rss
+    return rss
+
+
+def _proc_rss(pid):
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+    
+    for child in _proc_children(pid):
+        rss += _proc_rss(child) or 0
+    return rss
+
+
+def _proc_children(pid):
+    children = []
+    with contextlib.suppress(OSError):
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with contextlib.suppress(OSError, ValueError), open(f'/proc/{pid}/task/{task}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+    return children
+
+
+class MemorySampler:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start_rss = None
+        self.peak_rss = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def __enter__(self):
+        self.start_rss = self.peak_rss = current_rss()
+        if self.start_rss is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._update(current_rss())
+    
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._update(current_rss())
+    
+    def _update(self, rss):
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+
+class PipelineBenchmark:
+    def __init__(self, input_path, engine=None, workers=None, use_cache=False, skip=(), output_format=None,
+                 deduplicate_transcripts=None, compact_frames=COMPACT_FRAMES):
+        self.input_path = os.path.abspath(input_path)
+        self.writer_options = {key: value for key, value in (('output_format', output_format),
+                                                             ('deduplicate_transcripts', deduplicate_transcripts))
+                               if value is not None}
+        self.engine = engine
+        self.workers = workers
+        self.use_cache = use_cache
+        self.compact_frames = compact_frames
+        self.skip = set(skip)
+        self.stages = []
+        self.state = {}
+    
+    def run(self):
+        for stage in STAGES:
+            if stage in self.skip:
+                continue
+            getattr(self, f"_stage_{stage}")()
+        return self.stages
+    
+    def _measure(self, name, rows, function, *args):
+        with MemorySampler() as memory, contextlib.redirect_stdout(io.StringIO()), metrics.stage(name):
+            start = time.perf_counter()
+            result = function(*args)
+            seconds = time.perf_counter() - start
+        
+        rows = rows(result) if callable(rows) else rows
+        self.stages.append({
+            'stage': name,
+            'seconds': seconds,
+            'rows': rows,
+            'rows_per_second': rows / seconds if seconds > 0 else None,
+            'peak_rss_mb': _megabytes(memory.peak_rss),
+            'rss_delta_mb': _megabytes(memory.peak_rss - memory.start_rss) if memory.peak_rss is not None else None
+        })
+        print(f"{name:<32}{seconds:>10.2f} с{rows:>12,} строк"
+              f"{(rows / seconds if seconds > 0 else 0):>14,.0f} строк/с"
+              f"{_format_mb(self.stages[-1]['peak_rss_mb']):>12}")
+        return result
+    
+    def _skipped(self, name, reason):
+        self.stages.append({'stage': name, 'skipped': reason})
+        print(f"{name:<32} пропущено: {reason}")
+    
+    def _stage_load(self):
+        if self.use_cache:
+            load = lambda: read_dialogs(self.input_path)
+            self._measure('cache_build', len, load)
+        else:
+            load = lambda: pd.concat(iter_dialog_chunks(self.input_path, all_columns=True), ignore_index=True)
+        self.state['dialogs'] = self._measure('load', len, load)
+    
+    def _stage_first_pass_analysis(self):
+        dialogs = self.state['dialogs']
+        options = {key: value for key, value in (('engine', self.engine), ('workers', self.workers)) if value}
+        analyzer = DoubleCheckAnalyzer(self.compact_frames)
+        errors_df, _ = self._measure('first_pass_analysis', len(dialogs),
+                                     lambda: analyzer.first_pass_analysis(dialogs, incremental=False, **options))
+        self.state['errors'] = errors_df if errors_df is not None else pd.DataFrame()
+    
+    def _stage_categorize_errors(self):
+        errors_df = self.state['errors']
+        if len(errors_df) == 0:
+            return self._skipped('categorize_errors', "нет ошибок")
+        uncategorized = errors_df.drop(columns=['Категория ошибки'])
+        self._measure('categorize_errors', len(errors_df), ErrorCategorizer().categorize_errors,
+                      uncategorized, len(self.state['dialogs']))
+    
+    def _stage_correction(self):
+        errors_df = self.state['errors']
+        if len(errors_df) == 0:
+            return self._skipped('correction', "нет ошибок")
+        self.state['corrections'] = self._measure('correction', len(errors_df), StatusCorrector().correct, errors_df)
+    
+    def _stage_create_corrected_dialogs_file(self):
+        from main import create_corrected_dialogs_file
+        
+        if 'corrections' not in self.state:
+            return self._skipped('create_corrected_dialogs_file', "нет исправлений")
+        writer = OutputWriter(**self.writer_options)
+        if writer.output_format == 'xlsx' and len(self.state['dialogs']) > EXCEL_MAX_ROWS:
+            return self._skipped('create_corrected_dialogs_file', "превышен лимит строк xlsx")
+        self._measure('create_corrected_dialogs_file', len(self.state['dialogs']), create_corrected_dialogs_file,
+                      self.state['corrections'], self.state['dialogs'], writer)
+    
+    def _stage_charts(self):
+        from visualizer import BusinessVisualizer
+        
+        errors_df = self.state['errors']
+        if len(errors_df) == 0:
+            return self._skipped('charts', "нет ошибок")
+        self._measure('charts', len(errors_df), lambda: BusinessVisualizer().create_all_charts(
+            errors_df, len(self.state['dialogs'])))
+    
+    def _stage_excel_export(self):
+        from main import generate_summary_report
+        
+        errors_df = self.state['errors']
+        if len(errors_df) == 0 or 'corrections' not in self.state:
+            return self._skipped('excel_export', "нет ошибок")
+        
+        def export():
+            writer = OutputWriter(**self.writer_options)
+            writer.write(errors_df, FINAL_RESULTS_FILE)
+            writer.write(self.state['corrections'], "output/correction_table.xlsx")
+            generate_summary_report(self.state['corrections'], writer)
+            writer.close()
+        
+        self._measure('excel_export', len(errors_df), export)
+
+
+def measure_startup(repeat=3, module='main'):
+    script = (f"import sys, time; start = time.perf_counter(); import {module}; "
+              f"print(time.perf_counter() - start); print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    timings, loaded = [], []
+    
+    for _ in range(repeat):
+        lines = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__))).stdout.splitlines()
+        timings.append(float(lines[0]))
+        loaded = [name for name in lines[1].split(',') if name] if len(lines) > 1 else []
+    
+    startup = {
+        'module': module,
+        'seconds': min(timings),
+        'budget_seconds': STARTUP_BUDGET_SECONDS,
+        'within_budget': min(timings) <= STARTUP_BUDGET_SECONDS and not loaded,
+        'eager_heavy_modules': loaded
+    }
+    print(f"Импорт {module}: {startup['seconds']:.2f} с (бюджет {STARTUP_BUDGET_SECONDS:.2f} с)")
+    if loaded:
+        print(f"  При старте загружаются тяжелые модули: {', '.join(loaded)}")
+    if not startup['within_budget']:
+        print("  Бюджет запуска превышен!")
+    return startup
+
+
+def _megabytes(value):
+    return round(value / (1024 * 1024), 1) if value is not None else None
+
+
+def _format_mb(value):
+    return f"{value:,.0f} МБ" if value is not None else "-"
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare_reports(report, baseline):
+    previous = {stage['stage']: stage for stage in baseline.get('stages', []) if 'seconds' in stage}
+    print(f"\nСравнение с {baseline.get('revision') or 'предыдущим запуском'}:")
+    for stage in report['stages']:
+        before = previous.get(stage['stage'])
+        if 'seconds' not in stage or before is None or not before['seconds']:
+            continue
+        speedup = (stage['rows_per_second'] or 0) / before['rows_per_second'] if before.get('rows_per_second') else 0
+        print(f"  {stage['stage']:<32}{before['seconds']:>10.2f} с ->{stage['seconds']:>8.2f} с"
+              f"  (скорость x{speedup:.2f})")
+
+
+def print_rule_stats(rules):
+    if not rules:
+        return
+    print(f"\n{'правило':<28}{'проверено':>12}{'пропущено':>12}{'сработало':>12}{'время, с':>10}")
+    for name, stats in rules.items():
+        print(f"{name:<28}{stats['evaluated']:>12,}{stats['skipped']:>12,}{stats['hits']:>12,}{stats['seconds']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк этапов конвейера на синтетических диалогах")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--input', help="готовый файл с диалогами вместо генерации")
+    parser.add_argument('--format', choices=['xlsx', 'parquet', 'csv'],
+                        help="формат синтетического файла (по умолчанию xlsx, если строк не больше лимита Excel)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=['batch', 'rows'])
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--use-cache', action='store_true', help="загружать диалоги через колоночный кэш")
+    parser.add_argument('--skip', nargs='*', default=[], choices=STAGES)
+    parser.add_argument('--output', help="путь для сохранения отчета в JSON")
+    parser.add_argument('--compare', help="JSON отчета предыдущего запуска для сравнения")
+    parser.add_argument('--output-format', choices=['xlsx', 'parquet', 'csv'], help="формат выходных таблиц")
+    parser.add_argument('--deduplicate-transcripts', action='store_true', default=None,
+                        help="писать транскрипты один раз, в таблицах ссылка transcript_id")
+    parser.add_argument('--compact-frames', action=argparse.BooleanOptionalAction, default=COMPACT_FRAMES,
+                        help="таблицы ошибок с категориями и Arrow-строками вместо object-колонок")
+    parser.add_argument('--skip-startup', action='store_true', help="не замерять время импорта main.py")
+    parser.add_argument('--profile', action='store_true', help="cProfile и tracemalloc по этапам (замедляет замер)")
+    args = parser.parse_args()
+    
+    cwd = os.getcwd()
+    startup = None if args.skip_startup else measure_startup()
+    output = os.path.abspath(args.output) if args.output else None
+    
+    if args.profile:
+        metrics.profile = True
+        metrics.profile_dir = os.path.abspath("output/profiles")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        input_path = os.path.abspath(args.input) if args.input else None
+        generate_seconds = None
+        
+        if input_path is None:
+            extension = args.format or ('xlsx' if args.rows <= EXCEL_MAX_ROWS else 'parquet')
+            input_path = os.path.join(workdir, f"synthetic_{args.rows}.{extension}")
+            print(f"Генерация {args.rows:,} диалогов ({extension})...")
+            start = time.perf_counter()
+            write_dialogs(input_path, args.rows, seed=args.seed)
+            generate_seconds = time.perf_counter() - start
+        
+        os.chdir(workdir)
+        os.makedirs('output', exist_ok=True)
+        try:
+            print(f"{'этап':<32}{'время':>12}{'строк':>18}{'скорость':>22}{'пик RSS':>12}")
+            stages = PipelineBenchmark(input_path, args.engine, args.workers, args.use_cache, args.skip,
+                                       args.output_format, args.deduplicate_transcripts, args.compact_frames).run()
+        finally:
+            os.chdir(cwd)
+    
+    report = {
+        'revision': _git_revision(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'parameters': {**vars(args), 'input': args.input, 'generate_seconds': generate_seconds},
+        'environment': {
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'startup': startup,
+        'stages': stages,
+        'total_seconds': sum(stage.get('seconds', 0) for stage in stages),
+        'metrics': metrics.report()
+    }
+    print(f"Всего: {report['total_seconds']:.2f} с")
+    print_rule_stats(report['metrics']['detection_rules'])
+    
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare_reports(report, json.load(f))
+    
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Отчет сохранен: {output}")
+
+
+if __name__ == "__main__":
+    main()
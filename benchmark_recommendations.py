@@ -0,0 +1,135 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from ai.fake_gigachat_server import FakeGigaChatServer
+from ai.gigachat_generator import GigaChatGenerator
+from ai.response_cache import ResponseCache
+from ai.script_generator import ScriptGenerator
+from error_categorizer import ErrorCategorizer
+
+SAMPLE_TRANSCRIPT = "bot: Здравствуйте! Планируете ли вы пользоваться услугами?; human: ну не знаю; bot: Спасибо, до свидания"
+
+
+def build_errors(categories_count):
+    names = list(ErrorCategorizer().categories.values())
+    categories = [names[i % len(names)] + (f" #{i // len(names) + 1}" if i >= len(names) else "")
+                  for i in range(categories_count)]
+    rows = [(category, SAMPLE_TRANSCRIPT) for i, category in enumerate(categories)
+            for _ in range((categories_count - i) * 10)]
+    return pd.DataFrame(rows, columns=['Категория ошибки', 'call_transcript'])
+
+
+def make_generator(server, concurrency, cache_dir, cached):
+    generator = ScriptGenerator()
+    generator.max_concurrency = concurrency
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator._initialize_ai()
+    
+    ai_generator = generator.ai_generator
+    ai_generator.auth_url = server.auth_url
+    ai_generator.api_url = server.api_url
+    ai_generator.cache = ResponseCache(cache_dir=cache_dir, ttl=None if cached else 0)
+    return generator
+
+
+def run_mode(name, errors_df, server, concurrency, cached, workdir):
+    GigaChatGenerator._tokens.clear()
+    cache_dir = os.path.join(workdir, f"cache_{name}")
+    
+    if cached:
+        with contextlib.redirect_stdout(io.StringIO()):
+            make_generator(server, concurrency, cache_dir, cached).generate_scripts_from_errors(errors_df, "ai")
+    
+    generator = make_generator(server, concurrency, cache_dir, cached)
+    ai_generator = generator.ai_generator
+    generate_script = ai_generator.generate_script
+    latencies = []
+    lock = threading.Lock()
+    
+    def timed_generate_script(*args):
+        start = time.perf_counter()
+        try:
+            return generate_script(*args)
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - start)
+    
+    ai_generator.generate_script = timed_generate_script
+    server.reset_stats()
+    
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator.generate_scripts_from_errors(errors_df, "ai")
+    wall_time = time.perf_counter() - start
+    
+    return {
+        'mode': name,
+        'concurrency': concurrency,
+        'cached': cached,
+        'categories': len(latencies),
+        'wall_time': wall_time,
+        'latency_p50': float(np.percentile(latencies, 50)),
+        'latency_p90': float(np.percentile(latencies, 90)),
+        'latency_p99': float(np.percentile(latencies, 99)),
+        'latency_max': float(max(latencies)),
+        'cache_hits': ai_generator.cache.hits,
+        'server': dict(server.stats)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк этапа генерации рекомендаций на заглушке GigaChat")
+    parser.add_argument('--categories', type=int, default=6)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--auth-latency', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="путь для сохранения результатов в JSON")
+    args = parser.parse_args()
+    
+    os.environ['GIGACHAT_CREDENTIALS'] = 'benchmark'
+    errors_df = build_errors(args.categories)
+    server = FakeGigaChatServer(latency=args.latency, jitter=args.jitter, auth_latency=args.auth_latency,
+                                error_rate=args.error_rate, rate_limit=args.rate_limit, seed=args.seed).start()
+    modes = [('serial', 1, False), ('concurrent', args.concurrency, False), ('cached', args.concurrency, True)]
+    
+    cwd = os.getcwd()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            os.makedirs('output', exist_ok=True)
+            for name, concurrency, cached in modes:
+                results.append(run_mode(name, errors_df, server, concurrency, cached, workdir))
+    finally:
+        os.chdir(cwd)
+        server.stop()
+    
+    print(f"Категорий: {args.categories}, задержка {args.latency}±{args.jitter} с, "
+          f"ошибки {args.error_rate:.0%}, лимит {args.rate_limit or 'нет'} запр/с")
+    print(f"{'режим':<12}{'потоков':>8}{'время, с':>10}{'p50, с':>9}{'p90, с':>9}{'p99, с':>9}"
+          f"{'из кэша':>9}{'токенов':>9}{'ошибок':>8}{'429':>6}")
+    for result in results:
+        server_stats = result['server']
+        print(f"{result['mode']:<12}{result['concurrency']:>8}{result['wall_time']:>10.2f}"
+              f"{result['latency_p50']:>9.3f}{result['latency_p90']:>9.3f}{result['latency_p99']:>9.3f}"
+              f"{result['cache_hits']:>9}{server_stats['auth']:>9}{server_stats['errors']:>8}{server_stats['rate_limited']:>6}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'parameters': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,23 @@
 DIALOGS_FILE = "data/Файл с транскибированными диалогами.xlsx"
 FIRST_PASS_FILE = "output/first_pass_errors.xlsx"
 FINAL_RESULTS_FILE = "output/final_confirmed_errors.xlsx"
+EXPORT_FINAL_RESULTS = True
+STAGE_WORKERS = 4
+
+OUTPUT_FORMAT = "xlsx"
+OUTPUT_CHUNK_SIZE = 10000
+EXCEL_MAX_ROWS = 1048575
+OUTPUT_DEDUPLICATE_TRANSCRIPTS = False
+TRANSCRIPTS_FILE = "output/transcripts.xlsx"
+CORRECTED_DIALOGS_DELTA_ONLY = False
+
+CHART_RENDER_MODE = "classic"
+CHART_DPI = 300
+CHART_FORMAT = "png"
+CHART_CACHE_FILE = ".cache/charts.json"
+
+INPUT_CACHE_DIR = ".cache/dialogs"
+INPUT_CACHE_MAX_ENTRIES = 3
 
 POSITIVE_PHRASES = [
     "да планируем", 
@@ -37,6 +54,8 @@ UNCLEAR_PHRASES = [
     "не определился"
 ]
 
+UNCLEAR_PATTERNS = [r"ну+\.{3}"]
+
 WRONG_PERSON_PHRASES = [
     "не председатель", 
     "не мой договор", 
@@ -52,4 +71,117 @@ PROBLEMATIC_PROMPTS = [
     'clarification_null',
     'clarification_what_company', 
     'clarification_already_phoned'
-]
\ No newline at end of file
+]
+
+ANALYSIS_ENGINE = "batch"
+ANALYSIS_CHUNK_SIZE = 50000
+ANALYSIS_WORKERS = 0
+DETECTION_REORDER_INTERVAL = 1000
+
+COMPACT_FRAMES = False
+TEXT_DTYPE = "string[pyarrow]"
+CATEGORY_COLUMNS = ['Статус', 'Result', 'Причина ошибки', 'Категория ошибки', 'result', 'call_status']
+
+INCREMENTAL_ANALYSIS = False
+RESULT_STORE_FILE = ".cache/results.sqlite"
+ANALYSIS_RULES_VERSION = 1
+
+STREAM_MAX_BATCH = 64
+STREAM_MAX_WAIT_MS = 0
+STREAM_HOST = "127.0.0.1"
+STREAM_PORT = 8765
+
+ERROR_RATE_WINDOW = 500
+ERROR_RATE_STREAM_WINDOW = 60
+ERROR_RATE_SLIDING_WINDOWS = 10
+ERROR_RATE_SPIKE_FACTOR = 2.0
+ERROR_RATE_SPIKE_MIN_ERRORS = 5
+ERROR_RATE_HISTORY = 1000
+ERROR_RATES_FILE = "output/error_rates.json"
+PRIORITY_LEVELS = [(5, "Критический"), (2, "Высокий"), (1, "Средний"), (0, "Низкий")]
+PRIORITY_COLORS = ['#FFB7C5', '#A2D2FF', '#BDE0FE', '#CDB4DB']
+
+RUN_REPORT_FILE = "output/run_report.json"
+PROFILE_STAGES = False
+PROFILE_DIR = "output/profiles"
+STARTUP_BUDGET_SECONDS = 1.0
+LAZY_MODULES = ["matplotlib", "requests", "openpyxl"]
+
+DIALOG_COLUMNS = {
+    'status': ['Статус', 'status'],
+    'result': ['result', 'результат'],
+    'transcript': ['call_transcript', 'транскрипт'],
+    'client': ['Номер клиента', 'client_id', 'id'],
+    'prompts': ['prompts_statistics', 'prompts'],
+    'duration': ['длительность', 'duration', 'call_duration'],
+    'call_status': ['call_status', 'статус звонка']
+}
+
+REQUIRED_DIALOG_COLUMNS = ['status', 'result', 'transcript', 'client']
+ROW_KEY_COLUMN = 'Номер строки'
+
+KEY_QUESTION = "планируете ли вы пользоваться"
+
+DEFINITE_POSITIVE_ANSWERS = [' да ', ' конечно ', ' естественно ', 'да,', 'конечно,']
+
+DEFINITE_NEGATIVE_ANSWERS = [' нет ', ' не ', 'нет,', 'не,']
+
+CRITICAL_PROMPTS = ['clarification_default', 'clarification_dont_understand', 'clarification_null']
+
+DIALOG_PROBLEM_PHRASES = [
+    "плохо слышно", 
+    "вас не слышно", 
+    "не понимаю", 
+    "что вы сказали",
+    "повторите", 
+    "не расслышал"
+]
+
+CRITICAL_QUESTIONS = [
+    "по какому контракту", 
+    "какой договор", 
+    "о какой компании",
+    "кто звонит", 
+    "по какому номеру", 
+    "о каком контракте"
+]
+
+BOT_DODGE_MARKERS = ['снижение трафика', 'планируете ли']
+
+CORRECTION_RULES_FILE = "data/correction_rules.json"
+
+CORRECTION_RULES = [
+    {
+        'category': "Ложный отток (клиент соглашается)",
+        'status_contains': "подтверждена",
+        'status': "угроза оттока не подтверждена",
+        'result': "согласие - да",
+        'reason': "Клиент соглашается, но был помечен как отток"
+    },
+    {
+        'category': "Серьезные проблемы коммуникации",
+        'status': "угроза оттока не определена, требуется уточнение",
+        'result': "отказ - проблемы связи",
+        'reason': "Критические проблемы коммуникации"
+    },
+    {
+        'category': "Неправильный собеседник",
+        'status': "угроза оттока не определена_ неверный контакт",
+        'result': "ошиблись номером",
+        'reason': "Диалог с лицом, не принимающим решения"
+    },
+    {
+        'category': "Неопределенность при оттоке",
+        'status': "угроза оттока требует уточнения",
+        'result': "отказ - не определён",
+        'reason': "Клиент выражает сомнения"
+    },
+    {
+        'category': "Игнорирование критических вопросов",
+        'status': "угроза оттока подтверждена",
+        'result': "отказ - уклонение от ответа",
+        'reason': "Клиент игнорирует ключевые вопросы"
+    }
+]
+
+UNCHANGED_REASON = "Без изменений"
@@ -0,0 +1,130 @@
+import time
+from config import DETECTION_REORDER_INTERVAL
+
+
+class DetectionContext:
+    __slots__ = ('status', 'dialog', 'prompts', 'hits', '_matcher', '_transcript_hits', '_response_hits')
+    
+    def __init__(self, matcher, status, dialog, prompts):
+        self.status = status.lower()
+        self.dialog = dialog
+        self.prompts = prompts
+        self.hits = set()
+        self._matcher = matcher
+        self._transcript_hits = None
+        self._response_hits = None
+    
+    @property
+    def transcript_hits(self):
+        if self._transcript_hits is None:
+            self._transcript_hits = self._matcher.scan(self.dialog.lower)
+        return self._transcript_hits
+    
+    @property
+    def response_hits(self):
+        if self._response_hits is None:
+            client_response = self.dialog.client_response()
+            self._response_hits = self._matcher.scan(client_response) if client_response else set()
+        return self._response_hits
+
+
+class DetectionRule:
+    __slots__ = ('name', 'reason', 'check', 'guard', 'terminal', 'masks', 'masked_by', 'cost', 'precedence',
+                 'evaluated', 'skipped', 'hits', 'seconds')
+    
+    def __init__(self, name, reason, check, guard=None, terminal=False, masks=(), cost=1e-5, precedence=0):
+        self.name = name
+        self.reason = reason
+        self.check = check
+        self.guard = guard
+        self.terminal = terminal
+        self.masks = tuple(masks)
+        self.masked_by = frozenset()
+        self.cost = cost
+        self.precedence = precedence
+        self.evaluated = 0
+        self.skipped = 0
+        self.hits = 0
+        self.seconds = 0.0
+    
+    def expected_cost(self):
+        return (self.seconds + self.cost) / (self.evaluated + 1)
+    
+    def hit_rate(self):
+        return (self.hits + 1) / (self.evaluated + 2)
+
+
+class RuleEngine:
+    def __init__(self, rules, reorder_interval=DETECTION_REORDER_INTERVAL):
+        self.rules = list(rules)
+        self.reorder_interval = reorder_interval
+        self.order = list(self.rules)
+        self._evaluations = 0
+        self._flushed = {rule.name: (0, 0, 0, 0.0) for rule in self.rules}
+        
+        for rule in self.rules:
+            rule.masked_by = frozenset(other.name for other in self.rules if other is not rule
+                                       and (other.terminal or rule.name in other.masks))
+        self._masking = {name for rule in self.rules for name in rule.masked_by}
+        self.reorder()
+    
+    def evaluate(self, context):
+        perf_counter = time.perf_counter
+        hits = context.hits
+        
+        for rule in self.order:
+            if not hits.isdisjoint(rule.masked_by) or (rule.guard is not None and not rule.guard(context)):
+                rule.skipped += 1
+                continue
+            
+            start = perf_counter()
+            hit = rule.check(context)
+            rule.seconds += perf_counter() - start
+            rule.evaluated += 1
+            
+            if hit:
+                rule.hits += 1
+                hits.add(rule.name)
+        
+        self._evaluations += 1
+        if self.reorder_interval and self._evaluations % self.reorder_interval == 0:
+            self.reorder()
+        
+        return [rule for rule in self.rules if rule.name in hits and hits.isdisjoint(rule.masked_by)]
+    
+    def record(self, name, evaluated, skipped, hits, seconds):
+        rule = next(rule for rule in self.rules if rule.name == name)
+        rule.evaluated += int(evaluated)
+        rule.skipped += int(skipped)
+        rule.hits += int(hits)
+        rule.seconds += seconds
+    
+    def reorder(self):
+        self.order = sorted(self.rules, key=self._rank)
+        return [rule.name for rule in self.order]
+    
+    def flush(self):
+        stats = {}
+        for rule in self.rules:
+            current = (rule.evaluated, rule.skipped, rule.hits, rule.seconds)
+            previous = self._flushed[rule.name]
+            if current[:2] == previous[:2]:
+                continue
+            stats[rule.name] = dict(zip(('evaluated', 'skipped', 'hits', 'seconds'),
+                                        (now - before for now, before in zip(current, previous))))
+            self._flushed[rule.name] = current
+        return stats
+    
+    def _rank(self, rule):
+        if rule.name not in self._masking:
+            return (1, rule.expected_cost())
+        masked_cost = sum(other.expected_cost() for other in self.rules if rule.name in other.masked_by)
+        return (0, rule.expected_cost() / (rule.hit_rate() * masked_cost))
+
+
+def join_reasons(matched):
+    return " | ".join(rule.reason for rule in matched) if matched else None
+
+
+def top_category(matched):
+    return min(matched, key=lambda rule: rule.precedence).reason if matched else None
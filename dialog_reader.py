@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+from config import ANALYSIS_CHUNK_SIZE, DIALOG_COLUMNS, REQUIRED_DIALOG_COLUMNS
+
+
+class DialogLoadError(Exception):
+    pass
+
+
+def find_column(columns, possible_names):
+    for name in possible_names:
+        for col in columns:
+            if name.lower() in str(col).lower():
+                return col
+    return None
+
+
+def resolve_columns(columns):
+    resolved = {role: find_column(columns, names) for role, names in DIALOG_COLUMNS.items()}
+    if not all(resolved[role] for role in REQUIRED_DIALOG_COLUMNS):
+        return None
+    return resolved
+
+
+def iter_dialog_chunks(path, chunk_size=ANALYSIS_CHUNK_SIZE, all_columns=False):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        yield from _iter_csv_chunks(path, chunk_size, all_columns)
+    elif extension == '.parquet':
+        yield from _iter_parquet_chunks(path, chunk_size, all_columns)
+    else:
+        yield from _iter_excel_chunks(path, chunk_size, all_columns)
+
+
+def guard_loading(chunks):
+    chunks = iter(chunks)
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        except Exception as e:
+            raise DialogLoadError(e) from e
+        yield chunk
+
+
+def selected_columns(header, all_columns=False):
+    resolved = None if all_columns else resolve_columns(header)
+    if resolved is None:
+        return list(header)
+    return [col for col in header if col in resolved.values()]
+
+
+def _iter_csv_chunks(path, chunk_size, all_columns):
+    names = selected_columns(list(pd.read_csv(path, nrows=0).columns), all_columns)
+    for chunk in pd.read_csv(path, usecols=names, chunksize=chunk_size):
+        yield normalize_missing(chunk[names].reset_index(drop=True))
+
+
+def _iter_parquet_chunks(path, chunk_size, all_columns):
+    import pyarrow.parquet as pq
+    
+    parquet_file = pq.ParquetFile(path)
+    names = selected_columns(parquet_file.schema_arrow.names, all_columns)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=names):
+        yield normalize_missing(batch.to_pandas())
+
+
+def _iter_excel_chunks(path, chunk_size, all_columns):
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        
+        header = [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+        resolved = None if all_columns else resolve_columns(header)
+        
+        if resolved is None:
+            positions = list(range(len(header)))
+        else:
+            positions = sorted({header.index(col) for col in resolved.values() if col is not None})
+        names = [header[i] for i in positions]
+        
+        chunk = []
+        empty_rows = 0
+        for row in rows:
+            if all(value is None for value in row):
+                empty_rows += 1
+                continue
+            
+            chunk.extend([None] * len(positions) for _ in range(empty_rows))
+            empty_rows = 0
+            chunk.append([row[i] if i < len(row) else None for i in positions])
+            
+            if len(chunk) >= chunk_size:
+                yield normalize_missing(pd.DataFrame(chunk, columns=names))
+                chunk = []
+        
+        if chunk:
+            yield normalize_missing(pd.DataFrame(chunk, columns=names))
+    finally:
+        workbook.close()
+
+
+def normalize_missing(frame):
+    return frame.where(frame.notna(), np.nan).infer_objects()
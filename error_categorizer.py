@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 import re
+from instrumentation import metrics
 
 class ErrorCategorizer:
     def __init__(self):
@@ -11,6 +13,8 @@ class ErrorCategorizer:
             'ignored_questions': 'Игнорирование критических вопросов',
             'false_negative_churn': 'Клиент отказывается, но статус не отток'
         }
+        self.precedence = ['wrong_person', 'false_positive_churn', 'false_negative_churn', 'uncertain_churn',
+                           'communication_breakdown', 'ignored_questions']
 
     def categorize_errors(self, df, total_dialogs):
         print("Категоризация ошибок...")
@@ -19,46 +23,35 @@ class ErrorCategorizer:
             print("Нет ошибок для категоризации")
             return df
             
-        categorized_errors = []
+        result_df = self.assign_categories(df)
         
-        for idx, row in df.iterrows():
-            category = self._determine_category(row)
-            categorized_row = row.copy()
-            categorized_row['Категория ошибки'] = category
-            categorized_errors.append(categorized_row)
-        
-        result_df = pd.DataFrame(categorized_errors)
-        
-        self._print_category_statistics(result_df, total_dialogs)
+        self.print_category_statistics(result_df, total_dialogs)
         
         return result_df
     
-    def _determine_category(self, row):
-        reason = str(row.get('Причина ошибки', ''))
-        
-        if 'Неправильный собеседник' in reason:
-            return self.categories['wrong_person']
-        if 'Ложный отток (клиент соглашается)' in reason:
-            return self.categories['false_positive_churn']
-        if 'Клиент отказывается, но статус не отток' in reason:
-            return self.categories['false_negative_churn']
-        if 'Неопределенность при оттоке' in reason:
-            return self.categories['uncertain_churn']
-        if 'Серьезные проблемы коммуникации' in reason:
-            return self.categories['communication_breakdown']
-        if 'Игнорирование критических вопросов' in reason:
-            return self.categories['ignored_questions']
-        
-        if ' | ' in reason:
-            return reason.split(' | ')[0]
-        return reason
+    def assign_categories(self, df):
+        with metrics.stage('categorization', rows=len(df)):
+            if 'Причина ошибки' in df.columns:
+                codes, reasons = pd.factorize(df['Причина ошибки'], use_na_sentinel=False)
+            else:
+                codes, reasons = np.zeros(len(df), dtype=np.intp), ['']
+            
+            reasons = pd.Series(np.asarray(reasons, dtype=object), dtype=object).map(str)
+            return df.assign(**{'Категория ошибки': self._determine_categories(reasons)[codes]})
+            
+    def _determine_categories(self, reasons):
+        conditions = [reasons.str.contains(self.categories[key], regex=False).to_numpy(dtype=bool) for key in self.precedence]
+        choices = [np.array(self.categories[key], dtype=object) for key in self.precedence]
+        fallback = reasons.str.split(' | ', n=1, regex=False).str[0].to_numpy(dtype=object)
+        return np.select(conditions, choices, default=fallback)
 
-    def _print_category_statistics(self, df, total_dialogs):
+    def print_category_statistics(self, df, total_dialogs, category_counts=None):
         print("\nСТАТИСТИКА ПО КАТЕГОРИЯМ ОШИБОК:")
         print("=" * 50)
         
         total_errors = len(df)
-        category_counts = df['Категория ошибки'].value_counts()
+        if category_counts is None:
+            category_counts = df['Категория ошибки'].value_counts()
         
         overall_error_percentage = (total_errors / total_dialogs) * 100
         
@@ -0,0 +1,206 @@
+import collections
+import json
+import os
+import numpy as np
+import pandas as pd
+from config import (ERROR_RATE_WINDOW, ERROR_RATE_SLIDING_WINDOWS, ERROR_RATE_SPIKE_FACTOR, ERROR_RATE_SPIKE_MIN_ERRORS,
+                    ERROR_RATE_HISTORY, ERROR_RATES_FILE, PRIORITY_LEVELS)
+
+
+def priority_level(percentage):
+    for threshold, level in PRIORITY_LEVELS:
+        if percentage >= threshold:
+            return level
+    return PRIORITY_LEVELS[-1][1]
+
+
+def format_alert(alert):
+    category = alert['category'] or "все категории"
+    return (f"Всплеск ошибок ({category}): {alert['error_rate']:.1%} при базовом уровне {alert['baseline_rate']:.1%}, "
+            f"окно {alert['start']}-{alert['end']}, ошибок {alert['errors']} из {alert['dialogs']}")
+
+
+class ErrorRateAggregator:
+    def __init__(self, window=ERROR_RATE_WINDOW, sliding_windows=ERROR_RATE_SLIDING_WINDOWS,
+                 spike_factor=ERROR_RATE_SPIKE_FACTOR, spike_min_errors=ERROR_RATE_SPIKE_MIN_ERRORS,
+                 history=ERROR_RATE_HISTORY, on_alert=None):
+        self.window = window
+        self.sliding_windows = sliding_windows
+        self.spike_factor = spike_factor
+        self.spike_min_errors = spike_min_errors
+        self.on_alert = on_alert
+        self.dialogs = 0
+        self.errors = 0
+        self.categories = collections.Counter()
+        self.series = collections.deque(maxlen=history)
+        self.alerts = collections.deque(maxlen=history)
+        self._current = None
+        self._closed_until = None
+        self._sliding = collections.deque()
+        self._sliding_dialogs = 0
+        self._sliding_errors = 0
+        self._sliding_categories = collections.Counter()
+    
+    def add(self, position, category=None):
+        current = self._window_for(position)
+        current['dialogs'] += 1
+        self.dialogs += 1
+        if category is not None:
+            current['errors'] += 1
+            current['categories'][category] += 1
+            self.errors += 1
+            self.categories[category] += 1
+    
+    def add_counts(self, position, dialogs, categories):
+        current = self._window_for(position)
+        current['dialogs'] += dialogs
+        self.dialogs += dialogs
+        for category, count in categories.items():
+            current['errors'] += count
+            current['categories'][category] += count
+            self.errors += count
+            self.categories[category] += count
+    
+    def add_batch(self, total_dialogs, positions, categories):
+        windows = pd.Series(np.asarray(positions, dtype=np.int64) - 1) // self.window
+        counts = pd.DataFrame({'window': windows, 'category': np.asarray(categories, dtype=object)})
+        counts = counts.groupby(['window', 'category'], sort=False).size()
+        
+        per_window = collections.defaultdict(dict)
+        for (window, category), count in counts.items():
+            per_window[window][category] = int(count)
+        
+        for start in range(0, total_dialogs, self.window):
+            self.add_counts(start, min(self.window, total_dialogs - start), per_window.get(start // self.window, {}))
+        self.flush()
+    
+    def advance(self, position):
+        self._close_until(position // self.window * self.window)
+    
+    def flush(self):
+        if self._current is not None:
+            self._close(self._current)
+            self._current = None
+    
+    def category_counts(self):
+        counts = pd.Series(dict(self.categories), dtype='int64', name='count')
+        return counts.sort_values(ascending=False, kind='stable')
+    
+    def priorities(self, sliding=False):
+        if sliding:
+            dialogs, _, categories = self._sliding_totals()
+        else:
+            dialogs, categories = self.dialogs, self.categories
+        
+        result = {}
+        for category, count in sorted(categories.items(), key=lambda item: -item[1]):
+            percentage = count / dialogs * 100 if dialogs else 0.0
+            result[category] = {'count': count, 'percentage': round(percentage, 2), 'priority': priority_level(percentage)}
+        return result
+    
+    def report(self):
+        sliding_dialogs, sliding_errors, _ = self._sliding_totals()
+        return {
+            'window': self.window,
+            'sliding_windows': self.sliding_windows,
+            'dialogs': self.dialogs,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.dialogs, 4) if self.dialogs else 0.0,
+            'categories': self.priorities(),
+            'sliding': {
+                'dialogs': sliding_dialogs,
+                'errors': sliding_errors,
+                'error_rate': round(sliding_errors / sliding_dialogs, 4) if sliding_dialogs else 0.0,
+                'categories': self.priorities(sliding=True)
+            },
+            'series': list(self.series),
+            'alerts': list(self.alerts)
+        }
+    
+    def save(self, path=ERROR_RATES_FILE):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2, default=str)
+        return path
+    
+    def _sliding_totals(self):
+        if self._current is None:
+            return self._sliding_dialogs, self._sliding_errors, self._sliding_categories
+        current = self._current
+        return (self._sliding_dialogs + current['dialogs'], self._sliding_errors + current['errors'],
+                self._sliding_categories + current['categories'])
+    
+    def _window_for(self, position):
+        start = position // self.window * self.window
+        current = self._current
+        if current is None or start > current['start']:
+            self._close_until(start)
+            current = self._current = self._empty_window(start)
+        return current
+    
+    def _empty_window(self, start):
+        return {'start': start, 'dialogs': 0, 'errors': 0, 'categories': collections.Counter()}
+    
+    def _close_until(self, start):
+        if self._current is not None:
+            if self._current['start'] >= start:
+                return
+            self._close(self._current)
+            self._current = None
+        
+        if self._closed_until is None:
+            return
+        empty_start = max(self._closed_until, start - self.sliding_windows * self.window)
+        while empty_start < start:
+            self._close(self._empty_window(empty_start))
+            empty_start += self.window
+    
+    def _close(self, window):
+        self._closed_until = window['start'] + self.window
+        self._check_spikes(window)
+        
+        self._sliding.append(window)
+        self._sliding_dialogs += window['dialogs']
+        self._sliding_errors += window['errors']
+        self._sliding_categories.update(window['categories'])
+        if len(self._sliding) > self.sliding_windows:
+            expired = self._sliding.popleft()
+            self._sliding_dialogs -= expired['dialogs']
+            self._sliding_errors -= expired['errors']
+            self._sliding_categories.subtract(expired['categories'])
+            self._sliding_categories = +self._sliding_categories
+        
+        self.series.append({
+            'start': window['start'],
+            'end': window['start'] + self.window,
+            'dialogs': window['dialogs'],
+            'errors': window['errors'],
+            'error_rate': round(window['errors'] / window['dialogs'], 4) if window['dialogs'] else 0.0,
+            'sliding_error_rate': round(self._sliding_errors / self._sliding_dialogs, 4) if self._sliding_dialogs else 0.0,
+            'categories': dict(window['categories'])
+        })
+    
+    def _check_spikes(self, window):
+        if not self._sliding or not window['dialogs']:
+            return
+        
+        baseline = [(None, window['errors'], self._sliding_errors)]
+        baseline += [(category, count, self._sliding_categories[category]) for category, count in window['categories'].items()]
+        
+        for category, count, baseline_count in baseline:
+            rate = count / window['dialogs']
+            baseline_rate = baseline_count / self._sliding_dialogs if self._sliding_dialogs else 0.0
+            if count >= self.spike_min_errors and rate >= baseline_rate * self.spike_factor:
+                alert = {
+                    'start': window['start'],
+                    'end': window['start'] + self.window,
+                    'category': category,
+                    'errors': count,
+                    'dialogs': window['dialogs'],
+                    'error_rate': round(rate, 4),
+                    'baseline_rate': round(baseline_rate, 4)
+                }
+                self.alerts.append(alert)
+                if self.on_alert is not None:
+                    self.on_alert(alert)
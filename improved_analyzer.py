@@ -1,192 +1,496 @@
 import pandas as pd
-import re
+import numpy as np
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from config import *
 from error_categorizer import ErrorCategorizer
+from error_rate_aggregator import ErrorRateAggregator
+from phrase_matcher import PhraseMatcher, phrase_pattern
+from dialog_reader import resolve_columns
+from result_store import ResultStore
+from instrumentation import CheckTimer, metrics
+from parsed_dialog import ParsedDialog, SPEAKER_BOT, SPEAKER_HUMAN
+from detection_rules import DetectionContext, DetectionRule, RuleEngine, join_reasons, top_category
 
 class DoubleCheckAnalyzer:
-    def __init__(self):
+    def __init__(self, compact_frames=COMPACT_FRAMES):
+        self.compact_frames = compact_frames
         self.categorizer = ErrorCategorizer()
+        self.dialogs_analyzed = 0
+        self.error_rates = ErrorRateAggregator()
+        self.checks = CheckTimer()
         
-        self.positive_pattern = re.compile(r'\b(да планируем|будем пользоваться|конечно будем|остаёмся|продолжаем|планируем дальше|да\b|конечно\b|естественно\b)\b', re.IGNORECASE)
-        self.negative_pattern = re.compile(r'\b(нет не планируем|уходим|не будем|отказываемся|не буду пользоваться|нет\b|не\b)\b', re.IGNORECASE)
-        self.unclear_pattern = re.compile(r'\b(нуу*\.{3}|не знаю|пока не могу|не уверен|сомневаюсь|надо подумать)\b', re.IGNORECASE)
-        self.wrong_person_pattern = re.compile(r'\b(не председатель|не мой договор|ошиблись номером|не являюсь|не тот человек)\b', re.IGNORECASE)
+        self.phrase_matcher = PhraseMatcher({
+            'positive': POSITIVE_PHRASES,
+            'negative': NEGATIVE_PHRASES,
+            'unclear': UNCLEAR_PHRASES,
+            'wrong_person': WRONG_PERSON_PHRASES,
+            'definite_positive': DEFINITE_POSITIVE_ANSWERS,
+            'definite_negative': DEFINITE_NEGATIVE_ANSWERS,
+            'dialog_problem': DIALOG_PROBLEM_PHRASES,
+            'critical_question': CRITICAL_QUESTIONS,
+            'bot_dodge': BOT_DODGE_MARKERS
+        }, whole_word={'positive', 'negative', 'unclear', 'wrong_person'}, pattern_sets={'unclear': UNCLEAR_PATTERNS})
+        
+        self.positive_pattern = phrase_pattern(POSITIVE_PHRASES, whole_word=True)
+        self.negative_pattern = phrase_pattern(NEGATIVE_PHRASES, whole_word=True)
+        self.unclear_pattern = phrase_pattern(UNCLEAR_PHRASES, whole_word=True, patterns=UNCLEAR_PATTERNS)
+        self.wrong_person_pattern = phrase_pattern(WRONG_PERSON_PHRASES, whole_word=True)
+        self.definite_positive_pattern = phrase_pattern(DEFINITE_POSITIVE_ANSWERS)
+        self.definite_negative_pattern = phrase_pattern(DEFINITE_NEGATIVE_ANSWERS)
+        self.dialog_problems_pattern = phrase_pattern(DIALOG_PROBLEM_PHRASES)
+        self.critical_questions_pattern = phrase_pattern(CRITICAL_QUESTIONS)
+        self.bot_dodge_pattern = phrase_pattern(BOT_DODGE_MARKERS)
+        
+        self.rule_engine = self._build_rule_engine()
     
-    def first_pass_analysis(self, df):
+    def first_pass_analysis(self, dialogs, engine=ANALYSIS_ENGINE, workers=ANALYSIS_WORKERS, chunk_size=ANALYSIS_CHUNK_SIZE,
+                            incremental=INCREMENTAL_ANALYSIS):
         print("Поиск подтвержденных ошибок классификации")
         
-        status_col = self._find_column(df, ['Статус', 'status'])
-        result_col = self._find_column(df, ['result', 'результат'])
-        transcript_col = self._find_column(df, ['call_transcript', 'транскрипт'])
-        client_col = self._find_column(df, ['Номер клиента', 'client_id', 'id'])
-        prompts_col = self._find_column(df, ['prompts_statistics', 'prompts'])
-        duration_col = self._find_column(df, ['длительность', 'duration', 'call_duration'])
-        call_status_col = self._find_column(df, ['call_status', 'статус звонка'])
+        if isinstance(dialogs, pd.DataFrame):
+            dialogs = dialogs.reset_index(drop=True)
+            first_chunk, chunks = dialogs, None
+        else:
+            chunks = metrics.iterate('load', dialogs)
+            first_chunk = next(chunks, pd.DataFrame())
         
-        if not all([status_col, result_col, transcript_col, client_col]):
+        columns = self._resolve_columns(first_chunk)
+        if columns is None:
             print("Не найдены необходимые колонки")
             return None, None
         
-        print(f"Анализ {len(df)} диалогов...")
+        workers = workers or os.cpu_count() or 1
+        store = ResultStore() if incremental else None
+        
+        try:
+            with metrics.stage('analysis'):
+                if chunks is None:
+                    print(f"Анализ {len(dialogs)} диалогов...")
+                    if workers > 1 and len(dialogs) > chunk_size:
+                        chunks = (dialogs.iloc[start:start + chunk_size] for start in range(0, len(dialogs), chunk_size))
+                        errors_df, detailed_df, _ = self._chunked_first_pass(chunks, columns, engine, workers, len(dialogs), store)
+                    else:
+                        keys, cached = self._lookup_results(store, dialogs, columns)
+                        errors_df, detailed_df, reasons = self.analyze_chunk(dialogs, columns, engine, cached=cached)
+                        self._save_results(store, keys, dialogs, columns, reasons, cached)
+                        print(f"Проверено {len(dialogs)}/{len(dialogs)} диалогов...")
+                    self.dialogs_analyzed = len(dialogs)
+                else:
+                    print("Потоковый анализ диалогов...")
+                    chunks = itertools.chain([first_chunk], chunks)
+                    errors_df, detailed_df, self.dialogs_analyzed = self._chunked_first_pass(chunks, columns, engine, workers, store=store)
+        finally:
+            if store is not None:
+                store.close()
+        
+        errors_df, detailed_df = self._compact(errors_df), self._compact(detailed_df)
+        
+        metrics.add_rows('analysis', self.dialogs_analyzed)
+        metrics.count('dialogs_analyzed', self.dialogs_analyzed)
+        metrics.count('errors_found', len(errors_df))
+        
+        if store is not None:
+            metrics.count('results_from_store', store.hits)
+            print(f"Инкрементальный анализ: из хранилища {store.hits:,}, проанализировано {store.misses:,} "
+                  f"(устаревших результатов: {store.stale:,})")
+        
+        print(f"Найдено {len(errors_df)} подтвержденных ошибок")
+        
+        self.error_rates = ErrorRateAggregator()
+        if len(errors_df) > 0:
+            self.error_rates.add_batch(self.dialogs_analyzed, errors_df[ROW_KEY_COLUMN], errors_df['Категория ошибки'])
+            print("Категоризация ошибок...")
+            self.categorizer.print_category_statistics(errors_df, self.dialogs_analyzed, self.error_rates.category_counts())
+        else:
+            self.error_rates.add_batch(self.dialogs_analyzed, [], [])
+        
+        return errors_df, detailed_df
+    
+    def analyze_chunk(self, df, columns, engine=ANALYSIS_ENGINE, cached=None):
+        reasons = np.full(len(df), None, dtype=object)
+        fresh = np.ones(len(df), dtype=bool)
+        if cached is not None:
+            fresh = ~cached[0]
+            reasons[~fresh] = cached[1][~fresh]
+        
+        if fresh.any():
+            rows = df if fresh.all() else df[fresh]
+            if engine == 'batch':
+                reasons[fresh] = self._batch_first_pass(rows, columns)
+            else:
+                reasons[fresh] = self._row_first_pass(rows, columns)
+        
+        metrics.add_check_seconds(self.checks.flush())
+        metrics.add_rule_stats(self.rule_engine.flush())
+        metrics.add_rule_hits(reasons)
+        errors_df, detailed_df = self._error_frames(df, columns, reasons)
+        
+        if len(errors_df) > 0:
+            errors_df = self.categorizer.assign_categories(errors_df)
+        
+        return errors_df, detailed_df, reasons
+    
+    def analyze_dialog(self, status, result, transcript, prompts=''):
+        matched = self.rule_engine.evaluate(
+            DetectionContext(self.phrase_matcher, str(status), ParsedDialog(str(transcript)), str(prompts))
+        )
+        return join_reasons(matched), top_category(matched)
+    
+    def _chunked_first_pass(self, chunks, columns, engine, workers, total=None, store=None):
+        needed = list(dict.fromkeys(col for col in columns.values() if col))
+        chunks = enumerate(self._positioned(chunks, needed))
+        results = {}
+        processed = 0
+        
+        def report(chunk_rows):
+            nonlocal processed
+            processed += chunk_rows
+            print(f"Проверено {processed}/{total} диалогов..." if total else f"Проверено {processed} диалогов...")
+        
+        def finish(number, chunk, keys, cached, result):
+            errors_df, detailed_df, reasons = result
+            self._save_results(store, keys, chunk, columns, reasons, cached)
+            results[number] = (errors_df, detailed_df)
+            report(len(chunk))
+        
+        if workers <= 1:
+            for number, chunk in chunks:
+                keys, cached = self._lookup_results(store, chunk, columns)
+                finish(number, chunk, keys, cached, self.analyze_chunk(chunk, columns, engine, cached=cached))
+        else:
+            print(f"Параллельный анализ: процессов {workers}")
+            
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = {}
+                
+                def submit():
+                    number, chunk = next(chunks, (None, None))
+                    if chunk is not None:
+                        keys, cached = self._lookup_results(store, chunk, columns)
+                        future = executor.submit(_analyze_chunk_in_worker, chunk, columns, engine, cached,
+                                                 self.compact_frames)
+                        pending[future] = (number, chunk, keys, cached)
+                
+                for _ in range(workers * 2):
+                    submit()
+                
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result, worker_metrics = future.result()
+                        metrics.merge(worker_metrics)
+                        finish(*pending.pop(future), result)
+                        submit()
+        
+        ordered = [results[number] for number in sorted(results)]
+        errors = [errors_df for errors_df, _ in ordered if len(errors_df) > 0]
+        detailed = [detailed_df for _, detailed_df in ordered if len(detailed_df) > 0]
         
-        confirmed_errors = []
-        detailed_errors = []
+        if not errors:
+            return pd.DataFrame(), pd.DataFrame(), processed
         
-        for idx, row in df.iterrows():
+        return pd.concat(errors, ignore_index=True), pd.concat(detailed, ignore_index=True), processed
+    
+    def _positioned(self, chunks, needed):
+        offset = 0
+        for chunk in chunks:
+            chunk = chunk[needed]
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+    
+    def _lookup_results(self, store, chunk, columns):
+        if store is None:
+            return None, None
+        keys = store.row_keys(chunk, columns)
+        return keys, store.lookup(keys)
+    
+    def _save_results(self, store, keys, chunk, columns, reasons, cached):
+        if store is not None:
+            store.save(keys, chunk, columns, reasons, ~cached[0])
+    
+    def _row_first_pass(self, df, columns):
+        status_col, result_col, transcript_col = columns['status'], columns['result'], columns['transcript']
+        prompts_col = columns['prompts']
+        
+        reasons = []
+        
+        for _, row in df.iterrows():
             status = str(row[status_col])
             result = str(row[result_col])
             transcript = str(row[transcript_col])
             prompts = str(row.get(prompts_col, '')) if prompts_col else ''
-            duration = str(row.get(duration_col, '')) if duration_col else ''
-            call_status = str(row.get(call_status_col, '')) if call_status_col else ''
-            
-            error_reason = self._analyze_dialog_for_errors(status, result, transcript, prompts)
             
-            if error_reason:
-                confirmed_errors.append({
-                    'Номер клиента': row[client_col],
-                    'Статус': status,
-                    'Result': result,
-                    'call_transcript': transcript,
-                    'Причина ошибки': error_reason
-                })
-                
-                detailed_errors.append({
-                    'Номер клиента': row[client_col],
-                    'result': result,
-                    'Статус': status,
-                    'call_transcript': transcript,
-                    'длительность': duration,
-                    'call_status': call_status,
-                    'prompts_statistics': prompts
-                })
+            reasons.append(self._analyze_dialog_for_errors(status, result, ParsedDialog(transcript), prompts))
             
-            if (idx + 1) % 1000 == 0:
-                print(f"Проверено {idx + 1}/{len(df)} диалогов...")
+        return np.array(reasons, dtype=object)
+        
+    def _batch_first_pass(self, df, columns, chunk_size=ANALYSIS_CHUNK_SIZE):
+        status_col, transcript_col, prompts_col = columns['status'], columns['transcript'], columns['prompts']
         
-        print(f"Найдено {len(confirmed_errors)} подтвержденных ошибок")
+        reasons = []
         
-        if confirmed_errors:
-            errors_df = pd.DataFrame(confirmed_errors)
-            categorized_errors = self.categorizer.categorize_errors(errors_df, len(df))
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            empty = pd.Series('', index=chunk.index, dtype=object)
             
-            detailed_df = pd.DataFrame(detailed_errors)
+            status = self._as_text(chunk[status_col])
+            transcript = self._as_text(chunk[transcript_col])
+            prompts = self._as_text(chunk[prompts_col]) if prompts_col else empty
             
-            return categorized_errors, detailed_df
+            reasons.append(self._batch_analyze_errors(status, transcript, prompts).to_numpy(dtype=object))
         
-        return pd.DataFrame(confirmed_errors), pd.DataFrame(detailed_errors)
+        if not reasons:
+            return np.array([], dtype=object)
+        
+        return np.concatenate(reasons)
     
-    def _analyze_dialog_for_errors(self, status, result, transcript, prompts):
-        reasons = []
-        status_lower = status.lower()
-        transcript_lower = transcript.lower()
+    def _error_frames(self, df, columns, reasons):
+        client_col, prompts_col = columns['client'], columns['prompts']
+        duration_col, call_status_col = columns['duration'], columns['call_status']
         
-        if self.wrong_person_pattern.search(transcript_lower):
-            return "Неправильный собеседник"
+        mask = pd.notna(reasons)
+        if not mask.any():
+            return pd.DataFrame(), pd.DataFrame()
         
-        if self._has_serious_prompt_problems(prompts, transcript):
-            reasons.append("Серьезные проблемы коммуникации")
+        def pick(col):
+            return df[col][mask]
         
-        client_response = self._extract_client_response(transcript)
-        if client_response:
-            client_response_lower = client_response.lower()
-            
-            if "угроза оттока подтверждена" in status_lower:
-                if self.positive_pattern.search(client_response_lower):
-                    if self._is_definite_positive_answer(client_response_lower):
-                        reasons.append("Ложный отток (клиент соглашается)")
-                elif self.unclear_pattern.search(client_response_lower) and len(reasons) == 0:
-                    reasons.append("Неопределенность при оттоке")
-            
-            elif "угроза оттока не подтверждена" in status_lower:
-                if self.negative_pattern.search(client_response_lower):
-                    if self._is_definite_negative_answer(client_response_lower):
-                        reasons.append("Клиент отказывается, но статус не отток")
+        index = df.index[mask]
+        as_text = self._as_compact_text if self.compact_frames else self._as_text
+        empty = pd.Series('', index=index, dtype=TEXT_DTYPE if self.compact_frames else object)
+        status = as_text(pick(columns['status']))
+        result = as_text(pick(columns['result']))
+        transcript = as_text(pick(columns['transcript']))
+        
+        errors_df = pd.DataFrame({
+            'Номер клиента': pick(client_col),
+            ROW_KEY_COLUMN: index.to_numpy(dtype=np.int64) + 1,
+            'Статус': status,
+            'Result': result,
+            'call_transcript': transcript,
+            'Причина ошибки': pd.Series(reasons[mask], index=index, dtype=object)
+        })
         
-        if self._has_critical_ignored_questions(transcript):
-            reasons.append("Игнорирование критических вопросов")
+        detailed_df = pd.DataFrame({
+            'Номер клиента': pick(client_col),
+            'result': result,
+            'Статус': status,
+            'call_transcript': transcript,
+            'длительность': as_text(pick(duration_col)) if duration_col else empty,
+            'call_status': as_text(pick(call_status_col)) if call_status_col else empty,
+            'prompts_statistics': as_text(pick(prompts_col)) if prompts_col else empty
+        })
         
-        return " | ".join(reasons) if reasons else None
+        return errors_df.reset_index(drop=True), detailed_df.reset_index(drop=True)
     
-    def _is_definite_positive_answer(self, response):
-        simple_positive = [' да ', ' конечно ', ' естественно ', 'да,', 'конечно,']
-        return any(answer in response for answer in simple_positive)
+    def _batch_analyze_errors(self, status, transcript, prompts):
+        index = status.index
+        status = status.reset_index(drop=True)
+        transcript = transcript.reset_index(drop=True)
+        prompts = prompts.reset_index(drop=True)
+        size = len(transcript)
+        checks = self.checks
+        
+        def run(name, candidates, check):
+            hits = check(candidates).reindex(range(size), fill_value=False).astype(bool) & candidates
+            self.rule_engine.record(name, candidates.sum(), size - candidates.sum(), hits.sum(), checks.lap(name))
+            return hits
+        
+        def contains(text, pattern):
+            return lambda rows: text[rows].str.contains(pattern)
+        
+        checks.start()
+        status_lower = status.str.lower()
+        transcript_lower = transcript.str.lower()
+        
+        wrong_person = run('wrong_person', pd.Series(True, index=range(size)), contains(transcript_lower, self.wrong_person_pattern))
+        
+        def serious_problems(rows):
+            problem_count = sum(prompts[rows].str.contains(problem, regex=False).astype(int) for problem in CRITICAL_PROMPTS)
+            single_problem = problem_count == 1
+            dialog_problems = transcript_lower[rows][single_problem].str.contains(self.dialog_problems_pattern)
+            return (problem_count >= 2) | dialog_problems.reindex(problem_count.index, fill_value=False)
+        
+        communication_breakdown = run('communication_breakdown', ~wrong_person & (prompts != ''), serious_problems)
+        
+        churn_confirmed = ~wrong_person & status_lower.str.contains("угроза оттока подтверждена", regex=False)
+        churn_not_confirmed = (~wrong_person & ~churn_confirmed
+                               & status_lower.str.contains("угроза оттока не подтверждена", regex=False))
+        
+        asks_key_question = (churn_confirmed | churn_not_confirmed) & transcript_lower.str.contains(KEY_QUESTION, regex=False)
+        client_response = self._batch_extract_client_response(transcript[asks_key_question])
+        response_lower = client_response.str.lower().reindex(range(size), fill_value='')
+        answered = response_lower != ''
+        checks.lap('client_response')
+        
+        positive = pd.Series(False, index=range(size))
+        
+        def false_positive_check(rows):
+            positive[rows] = response_lower[rows].str.contains(self.positive_pattern).to_numpy(dtype=bool)
+            return positive[rows] & response_lower[rows].str.contains(self.definite_positive_pattern)
+        
+        false_positive = run('false_positive_churn', churn_confirmed & answered, false_positive_check)
+        uncertain = run('uncertain_churn', churn_confirmed & answered & ~communication_breakdown & ~false_positive,
+                        lambda rows: ~positive[rows] & response_lower[rows].str.contains(self.unclear_pattern))
+        false_negative = run('false_negative_churn', churn_not_confirmed & answered,
+                             lambda rows: (response_lower[rows].str.contains(self.negative_pattern)
+                                           & response_lower[rows].str.contains(self.definite_negative_pattern)))
+        
+        def ignored_questions_check(rows):
+            text = transcript_lower[rows]
+            asks_critical_question = (text.str.replace('human:', '', regex=False).str.contains(self.critical_questions_pattern)
+                                      & text.str.contains(self.bot_dodge_pattern))
+            return self._batch_has_critical_ignored_questions(transcript[rows][asks_critical_question])
+        
+        ignored_questions = run('ignored_questions', ~wrong_person, ignored_questions_check)
+        
+        reasons = self._join_reasons(
+            np.where(communication_breakdown, "Серьезные проблемы коммуникации", ''),
+            np.select(
+                [false_positive, uncertain, false_negative],
+                ["Ложный отток (клиент соглашается)", "Неопределенность при оттоке",
+                 "Клиент отказывается, но статус не отток"],
+                ''
+            ),
+            np.where(ignored_questions, "Игнорирование критических вопросов", '')
+        )
+        reasons = np.where(wrong_person, "Неправильный собеседник", reasons)
+        
+        return pd.Series(reasons, index=index, dtype=object).where(reasons != '', None)
     
-    def _is_definite_negative_answer(self, response):
-        simple_negative = [' нет ', ' не ', 'нет,', 'не,']
-        return any(answer in response for answer in simple_negative)
+    def _batch_extract_client_response(self, transcript):
+        lines = transcript.str.split(';').explode().str.strip()
+        
+        key_question = (lines.str.lower().str.contains(KEY_QUESTION, regex=False)
+                        & lines.str.contains('bot:', regex=False))
+        found_key_question = key_question.astype(np.int8).groupby(level=0).cummax().astype(bool)
+        
+        answers = lines[found_key_question & ~key_question & lines.str.startswith('human:')]
+        answers = answers.str.replace('human:', '', regex=False).str.strip()
+        
+        answers = answers[answers.str.len() > 1]
+        if answers.empty:
+            return pd.Series(dtype=object)
+        
+        dialogs, starts = np.unique(answers.index.to_numpy(), return_index=True)
+        groups = np.split(answers.to_numpy(dtype=object), starts[1:])
+        
+        return pd.Series([' '.join(group) for group in groups], index=dialogs, dtype=object)
+    
+    def _batch_has_critical_ignored_questions(self, transcript):
+        lines = transcript.str.split(';').explode().str.strip()
+        
+        client_text = lines.str.replace('human:', '', regex=False).str.strip().str.lower()
+        bot_response = lines.str.replace('bot:', '', regex=False).str.strip().str.lower()
+        
+        asked = lines.str.startswith('human:') & client_text.str.contains(self.critical_questions_pattern)
+        dodged = (lines.str.startswith('bot:') & ~bot_response.str.contains(self.critical_questions_pattern)
+                  & bot_response.str.contains(self.bot_dodge_pattern))
+        
+        by_dialog = dodged.groupby(level=0)
+        dodged_next = by_dialog.shift(-1, fill_value=False) | by_dialog.shift(-2, fill_value=False)
+        
+        return (asked & dodged_next).groupby(level=0).any()
     
-    def _has_serious_prompt_problems(self, prompts, transcript):
+    def _as_text(self, column):
+        return pd.Series([str(value) for value in column], index=column.index, dtype=object)
+    
+    def _as_compact_text(self, column):
+        if pd.api.types.is_string_dtype(column):
+            return column.astype(TEXT_DTYPE).fillna('nan')
+        return pd.Series(pd.array([str(value) for value in column], dtype=TEXT_DTYPE), index=column.index)
+    
+    def _compact(self, df):
+        if not self.compact_frames or len(df) == 0:
+            return df
+        return df.astype({col: 'category' for col in CATEGORY_COLUMNS if col in df.columns})
+    
+    def _join_reasons(self, *columns):
+        joined = np.asarray(columns[0], dtype=object)
+        for column in columns[1:]:
+            column = np.asarray(column, dtype=object)
+            separator = np.where((joined != '') & (column != ''), " | ", '')
+            joined = joined + separator + column
+        return joined
+    
+    def _analyze_dialog_for_errors(self, status, result, dialog, prompts):
+        return join_reasons(self.rule_engine.evaluate(DetectionContext(self.phrase_matcher, status, dialog, prompts)))
+        
+    def _build_rule_engine(self):
+        categories = self.categorizer.categories
+        precedence = {key: rank for rank, key in enumerate(self.categorizer.precedence)}
+        
+        def churn_confirmed(context):
+            return "угроза оттока подтверждена" in context.status
+        
+        def churn_not_confirmed(context):
+            return not churn_confirmed(context) and "угроза оттока не подтверждена" in context.status
+            
+        def rule(key, check, **options):
+            return DetectionRule(key, categories[key], check, precedence=precedence[key], **options)
+            
+        return RuleEngine([
+            rule('wrong_person', lambda context: 'wrong_person' in context.transcript_hits,
+                 terminal=True, cost=2e-5),
+            rule('communication_breakdown',
+                 lambda context: self._has_serious_prompt_problems(context.prompts, context.transcript_hits),
+                 guard=lambda context: bool(context.prompts), masks=['uncertain_churn'], cost=3e-6),
+            rule('false_positive_churn',
+                 lambda context: 'positive' in context.response_hits and 'definite_positive' in context.response_hits,
+                 guard=churn_confirmed, masks=['uncertain_churn'], cost=1e-5),
+            rule('uncertain_churn',
+                 lambda context: 'positive' not in context.response_hits and 'unclear' in context.response_hits,
+                 guard=churn_confirmed, cost=1e-5),
+            rule('false_negative_churn',
+                 lambda context: 'negative' in context.response_hits and 'definite_negative' in context.response_hits,
+                 guard=churn_not_confirmed, cost=1e-5),
+            rule('ignored_questions', lambda context: self._has_critical_ignored_questions(context.dialog, context.transcript_hits),
+                 cost=5e-6)
+        ])
+    
+    def _has_serious_prompt_problems(self, prompts, transcript_hits):
         if not prompts:
             return False
             
-        critical_prompts = ['clarification_default', 'clarification_dont_understand', 'clarification_null']
-        problem_count = sum(1 for problem in critical_prompts if problem in prompts)
+        problem_count = sum(1 for problem in CRITICAL_PROMPTS if problem in prompts)
         
         if problem_count >= 2:
             return True
-        elif problem_count >= 1 and self._has_dialog_problems(transcript):
+        elif problem_count >= 1 and 'dialog_problem' in transcript_hits:
             return True
             
         return False
     
-    def _has_dialog_problems(self, transcript):
-        problems = [
-            "плохо слышно", "вас не слышно", "не понимаю", "что вы сказали",
-            "повторите", "не расслышал"
-        ]
-        return any(problem in transcript.lower() for problem in problems)
-    
-    def _has_critical_ignored_questions(self, transcript):
-        critical_questions = [
-            "по какому контракту", "какой договор", "о какой компании",
-            "кто звонит", "по какому номеру", "о каком контракте"
-        ]
-        
-        lines = transcript.split(';')
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if line.startswith('human:'):
-                client_text = line.replace('human:', '').strip().lower()
-                
-                if any(question in client_text for question in critical_questions):
-                    for j in range(i+1, min(i+3, len(lines))):
-                        next_line = lines[j].strip()
-                        if next_line.startswith('bot:'):
-                            bot_response = next_line.replace('bot:', '').strip().lower()
-                            if not any(question in bot_response for question in critical_questions):
-                                if 'снижение трафика' in bot_response or 'планируете ли' in bot_response:
-                                    return True
-        return False
-    
-    def _extract_client_response(self, transcript):
-        if not isinstance(transcript, str):
-            return ""
-            
-        lines = transcript.split(';')
-        client_response = ""
-        found_key_question = False
+    def _has_critical_ignored_questions(self, dialog, transcript_hits):
+        if 'critical_question' not in transcript_hits and not dialog.has_inner_tags():
+            return False
         
-        for line in lines:
-            line = line.strip()
-            
-            if 'планируете ли вы пользоваться' in line.lower() and 'bot:' in line:
-                found_key_question = True
+        for i in range(len(dialog)):
+            if dialog.speakers[i] != SPEAKER_HUMAN:
                 continue
             
-            if found_key_question and line.startswith('human:'):
-                answer = line.replace('human:', '').strip()
-                if answer and len(answer) > 1:
-                    client_response += " " + answer
-                elif line.startswith('bot:') and ('планируете' in line.lower() or 'уточните' in line.lower()):
-                    break
-        
-        return client_response.strip()
-    
-    def _find_column(self, df, possible_names):
-        for name in possible_names:
-            for col in df.columns:
-                if name.lower() in str(col).lower():
-                    return col
-        return None
\ No newline at end of file
+            if 'critical_question' in self.phrase_matcher.scan(dialog.text(i)):
+                for j in range(i+1, min(i+3, len(dialog))):
+                    if dialog.speakers[j] == SPEAKER_BOT:
+                        bot_hits = self.phrase_matcher.scan(dialog.text(j))
+                        if 'critical_question' not in bot_hits and 'bot_dodge' in bot_hits:
+                            return True
+        return False
+    
+    def _resolve_columns(self, df):
+        return resolve_columns(df.columns)
+
+_worker_analyzer = None
+
+
+def _analyze_chunk_in_worker(chunk, columns, engine, cached=None, compact_frames=COMPACT_FRAMES):
+    global _worker_analyzer
+    if _worker_analyzer is None or _worker_analyzer.compact_frames != compact_frames:
+        _worker_analyzer = DoubleCheckAnalyzer(compact_frames)
+    metrics.profile = False
+    metrics.reset()
+    result = _worker_analyzer.analyze_chunk(chunk, columns, engine, cached=cached)
+    return result, metrics.snapshot()
\ No newline at end of file
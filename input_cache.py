@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import time
+import pandas as pd
+from config import ANALYSIS_CHUNK_SIZE, INPUT_CACHE_DIR, INPUT_CACHE_MAX_ENTRIES
+from dialog_reader import iter_dialog_chunks, normalize_missing, selected_columns
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+MANIFEST_FILE = "manifest.json"
+
+
+def read_dialog_chunks(path, chunk_size=ANALYSIS_CHUNK_SIZE, all_columns=False):
+    if pa is None or not path.lower().endswith('.xlsx'):
+        yield from iter_dialog_chunks(path, chunk_size, all_columns)
+        return
+    
+    cache_file = _lookup(path)
+    if cache_file is not None:
+        print(f"Диалоги загружаются из кэша: {cache_file}")
+        yield from _iter_cached_chunks(cache_file, all_columns)
+    else:
+        yield from _build_cache(path, chunk_size, all_columns)
+
+
+def cached_dialog_chunks(path, all_columns=False):
+    if pa is None or not path.lower().endswith('.xlsx'):
+        return None
+    
+    cache_file = _lookup(path)
+    if cache_file is None:
+        return None
+    return _iter_cached_chunks(cache_file, all_columns)
+
+
+def read_dialogs(path):
+    chunks = list(read_dialog_chunks(path, all_columns=True))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _iter_cached_chunks(cache_file, all_columns):
+    with pa.memory_map(cache_file) as source:
+        reader = pa.ipc.open_file(source)
+        selected = selected_columns(reader.schema.names, all_columns)
+        
+        for i in range(reader.num_record_batches):
+            yield normalize_missing(reader.get_batch(i).select(selected).to_pandas())
+
+
+def _build_cache(path, chunk_size, all_columns):
+    os.makedirs(INPUT_CACHE_DIR, exist_ok=True)
+    content_hash = _content_hash(path)
+    cache_file = os.path.join(INPUT_CACHE_DIR, f"{content_hash}.arrow")
+    temp_file = f"{cache_file}.{os.getpid()}.tmp"
+    
+    writer = None
+    schema = None
+    completed = False
+    
+    try:
+        for chunk in iter_dialog_chunks(path, chunk_size, all_columns=True):
+            if writer is not None or schema is None:
+                try:
+                    if schema is None:
+                        schema = _schema_for(chunk)
+                        writer = pa.ipc.new_file(temp_file, schema)
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                except (pa.ArrowInvalid, pa.ArrowTypeError, OSError) as e:
+                    print(f"Кэш диалогов не создан: {e}")
+                    writer = _discard(writer, temp_file)
+            
+            yield chunk if all_columns else chunk[selected_columns(list(chunk.columns))]
+        
+        completed = True
+    finally:
+        if writer is not None and completed:
+            writer.close()
+            os.replace(temp_file, cache_file)
+            _register(path, content_hash, cache_file)
+            print(f"Кэш диалогов сохранен: {cache_file}")
+        elif writer is not None:
+            _discard(writer, temp_file)
+
+
+def _schema_for(chunk):
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema.remove_metadata()
+
+
+def _discard(writer, temp_file):
+    try:
+        writer.close()
+    except Exception:
+        pass
+    if os.path.exists(temp_file):
+        os.remove(temp_file)
+    return None
+
+
+def _lookup(path):
+    manifest = _load_manifest()
+    entry = manifest.get(os.path.abspath(path))
+    stat = os.stat(path)
+    
+    if entry is None:
+        return None
+    
+    if (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+        content_hash = _content_hash(path)
+        if content_hash != entry['hash']:
+            del manifest[os.path.abspath(path)]
+            _evict(manifest)
+            return None
+        entry['size'], entry['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+    
+    if not os.path.exists(entry['file']):
+        del manifest[os.path.abspath(path)]
+        _save_manifest(manifest)
+        return None
+    
+    entry['used'] = time.time()
+    _save_manifest(manifest)
+    return entry['file']
+
+
+def _register(path, content_hash, cache_file):
+    stat = os.stat(path)
+    manifest = _load_manifest()
+    manifest[os.path.abspath(path)] = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': content_hash,
+        'file': cache_file,
+        'used': time.time()
+    }
+    _evict(manifest)
+
+
+def _evict(manifest):
+    entries = sorted(manifest.items(), key=lambda item: item[1]['used'], reverse=True)
+    for source, _ in entries[INPUT_CACHE_MAX_ENTRIES:]:
+        del manifest[source]
+    
+    _save_manifest(manifest)
+    
+    referenced = {os.path.abspath(entry['file']) for entry in manifest.values()}
+    for name in os.listdir(INPUT_CACHE_DIR):
+        cache_file = os.path.abspath(os.path.join(INPUT_CACHE_DIR, name))
+        if name.endswith('.arrow') and cache_file not in referenced:
+            os.remove(cache_file)
+            print(f"Удален устаревший кэш: {name}")
+
+
+def _content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_manifest():
+    try:
+        with open(os.path.join(INPUT_CACHE_DIR, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest):
+    os.makedirs(INPUT_CACHE_DIR, exist_ok=True)
+    manifest_file = os.path.join(INPUT_CACHE_DIR, MANIFEST_FILE)
+    with open(f"{manifest_file}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(f"{manifest_file}.tmp", manifest_file)
@@ -0,0 +1,220 @@
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from config import PROFILE_DIR, PROFILE_STAGES, RUN_REPORT_FILE
+
+PROFILE_TOP_FUNCTIONS = 20
+PROFILE_TOP_ALLOCATIONS = 10
+
+
+class CheckTimer:
+    def __init__(self):
+        self.seconds = Counter()
+        self._last = None
+    
+    def start(self):
+        self._last = time.perf_counter()
+    
+    def lap(self, name):
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self.seconds[name] += elapsed
+        self._last = now
+        return elapsed
+    
+    def flush(self):
+        seconds, self.seconds = self.seconds, Counter()
+        return seconds
+
+
+class RunMetrics:
+    def __init__(self, profile=PROFILE_STAGES, profile_dir=PROFILE_DIR):
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tracing = False
+        self.reset()
+    
+    def reset(self):
+        self.started = datetime.datetime.now()
+        self.stages = {}
+        self.profiles = {}
+        self._profile_stats = {}
+        self.counters = Counter()
+        self.rule_hits = Counter()
+        self.check_seconds = Counter()
+        self.rule_stats = {}
+    
+    @contextmanager
+    def stage(self, name, rows=None, profile=True):
+        depth = getattr(self._local, 'depth', 0)
+        profiler = self._start_profiling() if profile and self.profile and depth == 0 else None
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._local.depth = depth
+            if profiler is not None:
+                self._stop_profiling(name, profiler)
+            self._record(name, seconds, rows)
+    
+    def iterate(self, name, chunks):
+        chunks = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            self._record(name, time.perf_counter() - start, len(chunk))
+            yield chunk
+    
+    def add_rows(self, name, rows):
+        with self._lock:
+            self._stage(name)['rows'] += rows
+    
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += int(value)
+    
+    def add_rule_hits(self, reasons):
+        hits = Counter(rule for reason in reasons if isinstance(reason, str) for rule in reason.split(" | "))
+        with self._lock:
+            self.rule_hits.update(hits)
+    
+    def add_check_seconds(self, seconds):
+        with self._lock:
+            self.check_seconds.update(seconds)
+    
+    def add_rule_stats(self, stats):
+        with self._lock:
+            for name, values in stats.items():
+                self.rule_stats.setdefault(name, Counter()).update(values)
+    
+    def snapshot(self):
+        with self._lock:
+            return {
+                'stages': {name: dict(stage) for name, stage in self.stages.items()},
+                'counters': dict(self.counters),
+                'rule_hits': dict(self.rule_hits),
+                'check_seconds': dict(self.check_seconds),
+                'rule_stats': {name: dict(values) for name, values in self.rule_stats.items()}
+            }
+    
+    def merge(self, snapshot):
+        with self._lock:
+            for name, other in snapshot['stages'].items():
+                stage = self._stage(name)
+                for key in ('seconds', 'calls', 'rows'):
+                    stage[key] += other[key]
+            self.counters.update(snapshot['counters'])
+            self.rule_hits.update(snapshot['rule_hits'])
+            self.check_seconds.update(snapshot['check_seconds'])
+            for name, values in snapshot['rule_stats'].items():
+                self.rule_stats.setdefault(name, Counter()).update(values)
+    
+    def report(self):
+        snapshot = self.snapshot()
+        stages = {}
+        for name, stage in snapshot['stages'].items():
+            stages[name] = {
+                **stage,
+                'rows_per_second': stage['rows'] / stage['seconds'] if stage['rows'] and stage['seconds'] > 0 else None
+            }
+            if name in self.profiles:
+                stages[name]['profile'] = self.profiles[name]
+        
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'finished': datetime.datetime.now().isoformat(timespec='seconds'),
+            'profiling': self.profile,
+            'stages': stages,
+            'counters': snapshot['counters'],
+            'rule_hits': dict(sorted(snapshot['rule_hits'].items(), key=lambda item: -item[1])),
+            'analysis_checks': {name: round(seconds, 4) for name, seconds in snapshot['check_seconds'].items()},
+            'detection_rules': {name: {
+                'evaluated': values.get('evaluated', 0),
+                'skipped': values.get('skipped', 0),
+                'hits': values.get('hits', 0),
+                'hit_rate': round(values.get('hits', 0) / values['evaluated'], 4) if values.get('evaluated') else None,
+                'seconds': round(values.get('seconds', 0.0), 4)
+            } for name, values in snapshot['rule_stats'].items()}
+        }
+    
+    def save(self, path=RUN_REPORT_FILE):
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
+    
+    def _stage(self, name):
+        return self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'rows': 0})
+    
+    def _record(self, name, seconds, rows):
+        with self._lock:
+            stage = self._stage(name)
+            stage['seconds'] += seconds
+            stage['calls'] += 1
+            stage['rows'] += rows or 0
+    
+    def _start_profiling(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        tracemalloc.reset_peak()
+        
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    
+    def _stop_profiling(self, name, profiler):
+        profiler.disable()
+        _, peak = tracemalloc.get_traced_memory()
+        allocations = tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]
+        
+        if name in self._profile_stats:
+            self._profile_stats[name].add(profiler)
+            peak = max(peak, self.profiles[name]['peak_memory_bytes'])
+        else:
+            self._profile_stats[name] = pstats.Stats(profiler)
+        
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profile_file = os.path.join(self.profile_dir, f"{name}.prof")
+        self._profile_stats[name].dump_stats(profile_file)
+        
+        stats = self._profile_stats[name].stats
+        top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+        
+        self.profiles[name] = {
+            'file': profile_file,
+            'peak_memory_bytes': peak,
+            'peak_memory_mb': round(peak / (1024 * 1024), 1),
+            'top_functions': [{
+                'function': f"{os.path.basename(filename)}:{line}({function})",
+                'calls': calls,
+                'own_seconds': round(own, 4),
+                'cumulative_seconds': round(cumulative, 4)
+            } for (filename, line, function), (_, calls, own, cumulative, _) in top],
+            'top_allocations': [{
+                'line': str(statistic.traceback[0]),
+                'size_mb': round(statistic.size / (1024 * 1024), 2),
+                'count': statistic.count
+            } for statistic in allocations]
+        }
+
+
+metrics = RunMetrics()
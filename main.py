@@ -2,9 +2,16 @@ import pandas as pd
 import os
 from dotenv import load_dotenv
 from improved_analyzer import DoubleCheckAnalyzer
-from config import DIALOGS_FILE, FINAL_RESULTS_FILE
+from status_corrector import StatusCorrector
+from stage_scheduler import StageScheduler
+from output_writers import OutputWriter
+from input_cache import cached_dialog_chunks, read_dialog_chunks
+from dialog_reader import DialogLoadError, guard_loading, iter_dialog_chunks
+from config import DIALOGS_FILE, FINAL_RESULTS_FILE, EXPORT_FINAL_RESULTS, ROW_KEY_COLUMN, CORRECTED_DIALOGS_DELTA_ONLY
+from instrumentation import metrics
 from ai.script_generator import ScriptGenerator  
 from visualizer import BusinessVisualizer
+from error_rate_aggregator import format_alert
 from ai.recommendation_selector import select_recommendation_type  
 
 load_dotenv()
@@ -14,110 +21,134 @@ def main():
     print("=" * 60)
     
     os.makedirs('output', exist_ok=True)
+    writer = OutputWriter()
+    final_results_file = writer.output_path(FINAL_RESULTS_FILE)
     
-    if os.path.exists(FINAL_RESULTS_FILE):
-        os.remove(FINAL_RESULTS_FILE)
-        print(f"Удален предыдущий файл: {FINAL_RESULTS_FILE}")
+    if os.path.exists(final_results_file):
+        os.remove(final_results_file)
+        print(f"Удален предыдущий файл: {final_results_file}")
     
     if not os.path.exists(DIALOGS_FILE):
         print(f"Файл с диалогами не найден: {DIALOGS_FILE}")
         return
     
-    print("Загрузка диалогов...")
+    analyzer = DoubleCheckAnalyzer()
+    
+    print("\n" + "="*50)
+    print("АНАЛИЗ ОШИБОК КЛАССИФИКАЦИИ")
+    
+    print("Потоковая загрузка диалогов...")
     try:
-        df = pd.read_excel(DIALOGS_FILE)
-        total_dialogs = len(df)
-        print(f"Загружено диалогов: {total_dialogs:,}")
-        
-    except Exception as e:
+        final_results, detailed_results = analyzer.first_pass_analysis(guard_loading(read_dialog_chunks(DIALOGS_FILE)))
+    except DialogLoadError as e:
         print(f"Ошибка загрузки: {e}")
         return
     
-    analyzer = DoubleCheckAnalyzer()
+    total_dialogs = analyzer.dialogs_analyzed
+    print(f"Загружено диалогов: {total_dialogs:,}")
     
-    print("\n" + "="*50)
-    print("АНАЛИЗ ОШИБОК КЛАССИФИКАЦИИ")
+    if total_dialogs == 0:
+        return
     
-    final_results, detailed_results = analyzer.first_pass_analysis(df)
+    error_rates = analyzer.error_rates
+    error_rates_file = error_rates.save()
+    print(f"Доля ошибок по окнам из {error_rates.window:,} диалогов сохранена: {error_rates_file}")
+    for alert in error_rates.alerts:
+        print(format_alert(alert))
     
     if final_results is not None and len(final_results) > 0:
-        final_results.to_excel(FINAL_RESULTS_FILE, index=False)
-        print(f"Основные ошибки сохранены: {FINAL_RESULTS_FILE}")
-        
-        print("\n" + "="*50)
-        print("КОРРЕКЦИЯ СТАТУСОВ И СОЗДАНИЕ ДОПОЛНИТЕЛЬНЫХ ФАЙЛОВ")
-        
-        correction_results = analyze_and_correct_errors()
-        
-        if correction_results is not None:
-            summary = generate_summary_report(correction_results)
-            create_corrected_dialogs_file(correction_results, DIALOGS_FILE)
-            print(f"Коррекция завершена! Созданы дополнительные файлы:")
-            print(f"    output/correction_table.xlsx - полная таблица исправлений")
-            print(f"    output/correction_summary.xlsx - сводный отчет")
-            print(f"    output/dialogs_with_corrected_status.xlsx - диалоги с верными статусами")
-        
-        print("\n" + "="*50)
-        print("СОЗДАНИЕ ГРАФИКОВ")
-        
-        visualizer = BusinessVisualizer()
-        charts = visualizer.create_all_charts(final_results, total_dialogs)
-        print(f"Создано графиков: {len(charts)}")
-        
         print("\n" + "="*50)
         print("ГЕНЕРАЦИЯ РЕКОМЕНДАЦИЙ ДЛЯ ИСПРАВЛЕНИЯ ОШИБОК")
         
         recommendation_type = select_recommendation_type()
-        
-        if recommendation_type != "none":
-            script_generator = ScriptGenerator()
-            scripts_generated = script_generator.generate_scripts_from_errors(final_results, recommendation_type)
-            
-            if not scripts_generated:
-                print("Рекомендации уже были сгенерированы ранее")
-        else:
+        if recommendation_type == "none":
             print("Рекомендации не требуются")
         
         print("\n" + "="*50)
-        print("АНАЛИЗ ЭФФЕКТИВНОСТИ КОРРЕКЦИИ")
-        print("=" * 50)
+        print("КОРРЕКЦИЯ СТАТУСОВ, ДОПОЛНИТЕЛЬНЫЕ ФАЙЛЫ, ГРАФИКИ И РЕКОМЕНДАЦИИ")
         
-        status_changes = (correction_results['Было_статус'] != correction_results['Стало_статус']).sum()
-        result_changes = (correction_results['Было_result'] != correction_results['Стало_result']).sum()
+        scheduler = StageScheduler()
+        if EXPORT_FINAL_RESULTS:
+            scheduler.add('final_results_export', lambda: export_final_results(final_results, FINAL_RESULTS_FILE, writer))
+        scheduler.add('correction', lambda: analyze_and_correct_errors(final_results, writer))
+        scheduler.add('summary', lambda corrections: generate_summary_report(corrections, writer), requires=['correction'])
+        scheduler.add('corrected_dialogs',
+                      lambda corrections: create_corrected_dialogs_file(corrections, DIALOGS_FILE, writer),
+                      requires=['correction'])
+        scheduler.add('charts', lambda: create_charts(final_results, total_dialogs, error_rates.category_counts()))
+        if recommendation_type != "none":
+            scheduler.add('recommendations', lambda: generate_recommendations(final_results, recommendation_type))
         
-        print(f"Статусов исправлено: {status_changes:,} из {len(correction_results):,}")
-        print(f"Result исправлен: {result_changes:,} из {len(correction_results):,}")
+        results = scheduler.run()
+        correction_results = results.get('correction')
         
-        correction_rate = (status_changes / len(correction_results)) * 100
-        print(f"Эффективность коррекции: {correction_rate:.1f}%")
+        transcripts_file = writer.close()
+        if transcripts_file:
+            print(f"Транскрипты сохранены один раз: {transcripts_file} (в таблицах ссылка transcript_id)")
         
-        if correction_rate > 80:
-            print("Высокая эффективность коррекции!")
-        elif correction_rate > 60:
-            print("Средняя эффективность коррекции")
-        else:
-            print("Низкая эффективность коррекции")
+        if 'summary' in results and 'corrected_dialogs' in results:
+            print(f"Коррекция завершена! Созданы дополнительные файлы:")
+            print(f"    {writer.output_path('output/correction_table.xlsx')} - полная таблица исправлений")
+            print(f"    {writer.output_path('output/correction_summary.xlsx')} - сводный отчет")
+            print(f"    {writer.output_path('output/dialogs_with_corrected_status.xlsx')} - диалоги с верными статусами")
+        
+        if correction_results is not None:
+            print("\n" + "="*50)
+            print("АНАЛИЗ ЭФФЕКТИВНОСТИ КОРРЕКЦИИ")
+            print("=" * 50)
             
+            status_changes = (correction_results['Было_статус'] != correction_results['Стало_статус']).sum()
+            result_changes = (correction_results['Было_result'] != correction_results['Стало_result']).sum()
+            
+            print(f"Статусов исправлено: {status_changes:,} из {len(correction_results):,}")
+            print(f"Result исправлен: {result_changes:,} из {len(correction_results):,}")
+            
+            correction_rate = (status_changes / len(correction_results)) * 100
+            print(f"Эффективность коррекции: {correction_rate:.1f}%")
+            
+            if correction_rate > 80:
+                print("Высокая эффективность коррекции!")
+            elif correction_rate > 60:
+                print("Средняя эффективность коррекции")
+            else:
+                print("Низкая эффективность коррекции")
+    
     else:
         print("Ошибок не найдено")
-        visualizer = BusinessVisualizer()
-        visualizer.create_accuracy_analysis_chart(pd.DataFrame(), total_dialogs)
+        with metrics.stage('charts'):
+            visualizer = BusinessVisualizer()
+            visualizer.create_accuracy_analysis_chart(pd.DataFrame(), total_dialogs)
         print("Создан график с результатами анализа")
+    
+    print(f"Отчет о запуске сохранен: {metrics.save()}")
+
+def export_final_results(df, output_file, writer=None):
+    writer = writer or OutputWriter()
+    with metrics.stage('export', rows=len(df)):
+        output_file = writer.write(df, output_file)
+    print(f"Основные ошибки сохранены: {output_file}")
+    return output_file
+    
+def create_charts(errors_df, total_dialogs, category_counts=None):
+    with metrics.stage('charts', rows=len(errors_df)):
+        visualizer = BusinessVisualizer()
+        charts = visualizer.create_all_charts(errors_df, total_dialogs, category_counts)
+    metrics.count('charts_created', len(charts))
+    print(f"Создано графиков: {len(charts)}")
+    return charts
 
-def analyze_and_correct_errors():
+def generate_recommendations(errors_df, recommendation_type):
+    script_generator = ScriptGenerator()
+    with metrics.stage('recommendations', rows=len(errors_df)):
+        scripts_generated = script_generator.generate_scripts_from_errors(errors_df, recommendation_type)
+    
+    if not scripts_generated:
+        print("Рекомендации уже были сгенерированы ранее")
+    return scripts_generated
+
+def analyze_and_correct_errors(df, writer=None):
     print("Запуск коррекции статусов...")
-    
-    try:
-        df = pd.read_excel('output/final_confirmed_errors.xlsx')
-        print(f"Загружено подтвержденных ошибок: {len(df):,}")
-    except Exception as e:
-        print(f"Ошибка загрузки файла: {e}")
-        
-        print("\nДоступные файлы:")
-        files = [f for f in os.listdir('.') if f.endswith('.xlsx')]
-        for file in files:
-            print(f"    {file}")
-        return None
+    print(f"Подтвержденных ошибок: {len(df):,}")
 
     required_columns = ['Номер клиента', 'Статус', 'Result', 'call_transcript', 'Категория ошибки']
     missing_columns = [col for col in required_columns if col not in df.columns]
@@ -127,35 +158,13 @@ def analyze_and_correct_errors():
         print(f"Доступные колонки: {list(df.columns)}")
         return None
     
-    correction_data = []
-    
     print(f"Анализ и коррекция статусов...")
     
-    for index, row in df.iterrows():
-        client_id = row['Номер клиента']
-        original_status = row['Статус']
-        original_result = row['Result']
-        error_category = row['Категория ошибки']
-        transcript = str(row['call_transcript'])
-        
-        corrected_status, corrected_result, correction_reason = analyze_and_correct(
-            original_status, original_result, error_category, transcript
-        )
-        
-        correction_data.append({
-            'Номер клиента': client_id,
-            'Было_статус': original_status,
-            'Стало_статус': corrected_status,
-            'Было_result': original_result,
-            'Стало_result': corrected_result,
-            'Тип_ошибки': error_category,
-            'Причина_коррекции': correction_reason,
-            'call_transcript': transcript
-        })
-    
-    correction_df = pd.DataFrame(correction_data)
-    output_file = "output/correction_table.xlsx"
-    correction_df.to_excel(output_file, index=False)
+    with metrics.stage('correction', rows=len(df)):
+        correction_df = StatusCorrector().correct(df)
+    writer = writer or OutputWriter()
+    with metrics.stage('export', rows=len(correction_df)):
+        output_file = writer.write(correction_df, "output/correction_table.xlsx")
     
     status_changes = (correction_df['Было_статус'] != correction_df['Стало_статус']).sum()
     result_changes = (correction_df['Было_result'] != correction_df['Стало_result']).sum()
@@ -164,47 +173,16 @@ def analyze_and_correct_errors():
     print(f"   Всего записей: {len(correction_df):,}")
     print(f"   Статусов изменено: {status_changes:,}")
     print(f"   Result изменен: {result_changes:,}")
+    metrics.count('statuses_corrected', status_changes)
+    metrics.count('results_corrected', result_changes)
     
     print(f"Таблица исправлений сохранена: {output_file}")
     
     return correction_df
 
-def analyze_and_correct(original_status, original_result, error_category, transcript):
-    corrected_status = original_status
-    corrected_result = original_result
-    correction_reason = "Без изменений"
-    
-    if error_category == "Ложный отток (клиент соглашается)":
-        if "подтверждена" in str(original_status).lower():
-            corrected_status = "угроза оттока не подтверждена"
-            corrected_result = "согласие - да"
-            correction_reason = "Клиент соглашается, но был помечен как отток"
-    
-    elif error_category == "Серьезные проблемы коммуникации":
-        corrected_status = "угроза оттока не определена, требуется уточнение"
-        corrected_result = "отказ - проблемы связи"
-        correction_reason = "Критические проблемы коммуникации"
-    
-    elif error_category == "Неправильный собеседник":
-        corrected_status = "угроза оттока не определена_ неверный контакт"
-        corrected_result = "ошиблись номером"
-        correction_reason = "Диалог с лицом, не принимающим решения"
-    
-    elif error_category == "Неопределенность при оттоке":
-        corrected_status = "угроза оттока требует уточнения"
-        corrected_result = "отказ - не определён"
-        correction_reason = "Клиент выражает сомнения"
-    
-    elif error_category == "Игнорирование критических вопросов":
-        corrected_status = "угроза оттока подтверждена"
-        corrected_result = "отказ - уклонение от ответа"
-        correction_reason = "Клиент игнорирует ключевые вопросы"
-    
-    return corrected_status, corrected_result, correction_reason
-
-def generate_summary_report(correction_df):
+def generate_summary_report(correction_df, writer=None):
     print(f"Генерация сводного отчета...")
-    summary = correction_df.groupby('Тип_ошибки').agg({
+    summary = correction_df.groupby('Тип_ошибки', observed=True).agg({
         'Номер клиента': 'count',
         'Было_статус': 'first',
         'Стало_статус': 'first'
@@ -212,38 +190,73 @@ def generate_summary_report(correction_df):
     
     summary['Процент'] = (summary['Количество'] / len(correction_df)) * 100
     
-    summary_file = "output/correction_summary.xlsx"
-    summary.to_excel(summary_file)
+    writer = writer or OutputWriter()
+    with metrics.stage('export', rows=len(summary)):
+        summary_file = writer.write(summary, "output/correction_summary.xlsx", index=True)
     
     print(f"Сводный отчет сохранен: {summary_file}")
     
     return summary
 
-def create_corrected_dialogs_file(correction_df, original_file_path):
+def create_corrected_dialogs_file(correction_df, dialogs, writer=None, delta_only=CORRECTED_DIALOGS_DELTA_ONLY):
     print("Создание файла с верными статусами...")
     
+    if ROW_KEY_COLUMN not in correction_df.columns:
+        print(f"В таблице коррекций нет колонки '{ROW_KEY_COLUMN}', сопоставление со строками диалогов невозможно")
+        return
+    
+    if isinstance(dialogs, pd.DataFrame):
+        chunks = [dialogs]
+    else:
+        chunks = cached_dialog_chunks(dialogs, all_columns=True)
+        if chunks is None:
+            print(f"Кэш диалогов недоступен, исходный файл читается повторно: {dialogs}")
+            chunks = iter_dialog_chunks(dialogs, all_columns=True)
+        else:
+            print("Строки диалогов берутся из кэша, исходный файл повторно не читается")
+        chunks = metrics.iterate('load', chunks)
+    
+    corrections = correction_df.set_index(correction_df[ROW_KEY_COLUMN].to_numpy() - 1)['Стало_статус']
+    if delta_only:
+        corrections = corrections[correction_df['Стало_статус'].to_numpy() != correction_df['Было_статус'].to_numpy()]
+    counts = {'rows': 0, 'corrected': 0}
+    
+    def corrected_chunks():
+        for chunk in chunks:
+            start = counts['rows']
+            chunk = chunk.set_axis(pd.RangeIndex(start, start + len(chunk)), axis=0)
+            counts['rows'] += len(chunk)
+            
+            status = corrections.reindex(chunk.index)
+            corrected = status.notna().to_numpy()
+            counts['corrected'] += int(corrected.sum())
+            
+            if delta_only:
+                chunk = chunk[corrected]
+                chunk.insert(0, ROW_KEY_COLUMN, chunk.index.to_numpy() + 1)
+                chunk['Верный статус (нужно заполнить)'] = status[corrected]
+            else:
+                chunk['Верный статус (нужно заполнить)'] = status.fillna('')
+            yield chunk
+    
+    writer = writer or OutputWriter()
+    output_path = "output/dialogs_with_corrected_status_delta.xlsx" if delta_only else "output/dialogs_with_corrected_status.xlsx"
     try:
-        original_df = pd.read_excel(original_file_path)
-        print(f"Загружен исходный файл: {original_file_path}")
-        print(f"Записей в исходном файле: {len(original_df):,}")
+        with metrics.stage('export'):
+            output_file = writer.write_chunks(corrected_chunks(), output_path)
     except Exception as e:
-        print(f"Ошибка загрузки исходного файла: {e}")
+        print(f"Ошибка создания файла с верными статусами: {e}")
         return
+    metrics.add_rows('export', counts['corrected'] if delta_only else counts['rows'])
     
-    correction_dict = dict(zip(correction_df['Номер клиента'], correction_df['Стало_статус']))
-    
-    if 'Верный статус' not in original_df.columns:
-        original_df['Верный статус (нужно заполнить)'] = ''
-    
-    original_df['Верный статус (нужно заполнить)'] = original_df['Номер клиента'].map(correction_dict).fillna('')
-    
-    corrected_count = original_df['Верный статус (нужно заполнить)'].notna().sum()
-    
-    output_file = "output/dialogs_with_corrected_status.xlsx"
-    original_df.to_excel(output_file, index=False)
-    
-    print(f"Файл с верными статусами создан: {output_file}")
-    print(f"Заполнено верных статусов: {corrected_count:,} из {len(original_df):,}")
+    print(f"Записей в исходном файле: {counts['rows']:,}")
+    if delta_only:
+        print(f"Файл только с измененными строками создан: {output_file}")
+        print(f"Измененных статусов: {counts['corrected']:,} из {counts['rows']:,}")
+    else:
+        print(f"Файл с верными статусами создан: {output_file}")
+        print(f"Заполнено верных статусов: {counts['corrected']:,} из {counts['rows']:,}")
+    return output_file
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,182 @@
+import os
+import threading
+import pandas as pd
+from config import OUTPUT_FORMAT, OUTPUT_DEDUPLICATE_TRANSCRIPTS, TRANSCRIPTS_FILE, OUTPUT_CHUNK_SIZE, EXCEL_MAX_ROWS
+
+TRANSCRIPT_COLUMN = 'call_transcript'
+TRANSCRIPT_ID_COLUMN = 'transcript_id'
+CLIENT_COLUMN = 'Номер клиента'
+
+
+def write_xlsx(df, path):
+    write_xlsx_chunks([df], path)
+
+
+def write_xlsx_chunks(chunks, path):
+    from openpyxl import Workbook
+    
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    rows = 0
+    header = True
+    
+    for df in chunks:
+        rows += len(df)
+        if rows > EXCEL_MAX_ROWS:
+            raise ValueError(f"В xlsx помещается не больше {EXCEL_MAX_ROWS:,} строк, используйте OUTPUT_FORMAT parquet или csv")
+        if header:
+            sheet.append([str(col) for col in df.columns])
+            header = False
+        
+        for start in range(0, len(df), OUTPUT_CHUNK_SIZE):
+            chunk = df.iloc[start:start + OUTPUT_CHUNK_SIZE].astype(object)
+            for row in chunk.where(chunk.notna(), None).itertuples(index=False, name=None):
+                sheet.append(row)
+    
+    workbook.save(path)
+
+
+def write_parquet(df, path):
+    write_parquet_chunks([df], path)
+
+
+def write_parquet_chunks(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    writer = None
+    try:
+        for df in chunks:
+            table = _arrow_table(df, None if writer is None else writer.schema)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    if writer is None:
+        pq.write_table(pa.table({}), path)
+
+
+def _arrow_table(df, schema=None):
+    import pyarrow as pa
+    
+    try:
+        return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        mixed = df.select_dtypes(include='object').columns
+        return pa.Table.from_pandas(df.astype({col: 'string' for col in mixed}), schema=schema, preserve_index=False)
+
+
+def write_csv(df, path):
+    df.to_csv(path, index=False, encoding='utf-8-sig', chunksize=OUTPUT_CHUNK_SIZE)
+
+
+def write_csv_chunks(chunks, path):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        header = True
+        for df in chunks:
+            df.to_csv(f, index=False, header=header, chunksize=OUTPUT_CHUNK_SIZE)
+            header = False
+
+
+WRITERS = {
+    'xlsx': write_xlsx,
+    'parquet': write_parquet,
+    'csv': write_csv
+}
+
+CHUNK_WRITERS = {
+    'xlsx': write_xlsx_chunks,
+    'parquet': write_parquet_chunks,
+    'csv': write_csv_chunks
+}
+
+
+def register_writer(output_format, writer, chunk_writer=None):
+    WRITERS[output_format] = writer
+    if chunk_writer is not None:
+        CHUNK_WRITERS[output_format] = chunk_writer
+    else:
+        CHUNK_WRITERS.pop(output_format, None)
+
+
+class OutputWriter:
+    def __init__(self, output_format=OUTPUT_FORMAT, deduplicate_transcripts=OUTPUT_DEDUPLICATE_TRANSCRIPTS,
+                 transcripts_file=TRANSCRIPTS_FILE):
+        if output_format not in WRITERS:
+            raise ValueError(f"Неизвестный формат вывода: {output_format} (доступны: {', '.join(WRITERS)})")
+        
+        self.output_format = output_format
+        self.deduplicate_transcripts = deduplicate_transcripts
+        self.transcripts_file = transcripts_file
+        self._transcript_ids = {}
+        self._transcript_clients = []
+        self._lock = threading.Lock()
+    
+    def output_path(self, path):
+        return f"{os.path.splitext(path)[0]}.{self.output_format}"
+    
+    def write(self, df, path, index=False):
+        if index:
+            df = df.reset_index()
+        if self.deduplicate_transcripts and TRANSCRIPT_COLUMN in df.columns:
+            df = self._reference_transcripts(df)
+        return self._write(df, path)
+    
+    def write_chunks(self, chunks, path):
+        if self.deduplicate_transcripts:
+            chunks = (self._reference_transcripts(df) if TRANSCRIPT_COLUMN in df.columns else df for df in chunks)
+        
+        if self.output_format not in CHUNK_WRITERS:
+            chunks = list(chunks)
+            return self._write(pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(), path)
+        
+        path = self._prepare_path(path)
+        CHUNK_WRITERS[self.output_format](chunks, path)
+        return path
+    
+    def _write(self, df, path):
+        path = self._prepare_path(path)
+        WRITERS[self.output_format](df, path)
+        return path
+    
+    def _prepare_path(self, path):
+        path = self.output_path(path)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+    
+    def close(self):
+        if not self._transcript_ids:
+            return None
+        
+        with self._lock:
+            transcripts = pd.DataFrame({
+                TRANSCRIPT_ID_COLUMN: list(self._transcript_ids.values()),
+                TRANSCRIPT_COLUMN: list(self._transcript_ids.keys())
+            })
+            clients = self._transcript_clients
+        
+        if clients:
+            clients = pd.concat(clients, ignore_index=True).drop_duplicates()
+            transcripts = transcripts.merge(clients, on=TRANSCRIPT_ID_COLUMN, how='left')
+            transcripts = transcripts[[TRANSCRIPT_ID_COLUMN, CLIENT_COLUMN, TRANSCRIPT_COLUMN]]
+        
+        return self._write(transcripts, self.transcripts_file)
+    
+    def _reference_transcripts(self, df):
+        codes, uniques = pd.factorize(df[TRANSCRIPT_COLUMN], use_na_sentinel=False)
+        
+        with self._lock:
+            ids = [self._transcript_ids.setdefault('' if pd.isna(text) else str(text), len(self._transcript_ids)) for text in uniques]
+            transcript_ids = pd.Series(ids, dtype='int64').to_numpy()[codes]
+            if CLIENT_COLUMN in df.columns:
+                clients = pd.DataFrame({CLIENT_COLUMN: df[CLIENT_COLUMN].to_numpy(), TRANSCRIPT_ID_COLUMN: transcript_ids})
+                self._transcript_clients.append(clients.drop_duplicates())
+        
+        position = df.columns.get_loc(TRANSCRIPT_COLUMN)
+        df = df.drop(columns=[TRANSCRIPT_COLUMN])
+        df.insert(position, TRANSCRIPT_ID_COLUMN, transcript_ids)
+        return df
@@ -0,0 +1,89 @@
+from array import array
+from config import KEY_QUESTION
+
+SPEAKER_OTHER = 0
+SPEAKER_BOT = 1
+SPEAKER_HUMAN = 2
+
+SPEAKER_TAGS = {SPEAKER_BOT: 'bot:', SPEAKER_HUMAN: 'human:'}
+
+
+class ParsedDialog:
+    __slots__ = ('transcript', 'lower', 'bounds', 'speakers', 'key_question_index')
+    
+    def __init__(self, transcript):
+        self.transcript = transcript
+        self.lower = transcript.lower()
+        self.bounds = bounds = array('I')
+        speakers = bytearray()
+        
+        position = 0
+        for segment in transcript.split(';'):
+            stripped = segment.strip()
+            start = position + len(segment) - len(segment.lstrip())
+            bounds.append(start)
+            bounds.append(start + len(stripped))
+            position += len(segment) + 1
+            
+            if stripped.startswith('human:'):
+                speakers.append(SPEAKER_HUMAN)
+            elif stripped.startswith('bot:'):
+                speakers.append(SPEAKER_BOT)
+            else:
+                speakers.append(SPEAKER_OTHER)
+        
+        self.speakers = bytes(speakers)
+        self.key_question_index = -1
+        if KEY_QUESTION in self.lower:
+            self.key_question_index = next(
+                (index for index in range(len(speakers)) if self.is_key_question(index)), -1
+            )
+    
+    def __len__(self):
+        return len(self.speakers)
+    
+    def turn(self, index):
+        return self.transcript[self.bounds[2 * index]:self.bounds[2 * index + 1]]
+    
+    def turn_lower(self, index):
+        if len(self.lower) != len(self.transcript):
+            return self.turn(index).lower()
+        return self.lower[self.bounds[2 * index]:self.bounds[2 * index + 1]]
+    
+    def has_inner_tag(self, index):
+        tag = SPEAKER_TAGS.get(self.speakers[index])
+        return tag is not None and self.transcript.count(tag, self.bounds[2 * index] + 1, self.bounds[2 * index + 1]) > 0
+    
+    def has_inner_tags(self):
+        tagged = self.speakers.count(SPEAKER_HUMAN) + self.speakers.count(SPEAKER_BOT)
+        return self.transcript.count('human:') + self.transcript.count('bot:') > tagged
+    
+    def text(self, index):
+        tag = SPEAKER_TAGS.get(self.speakers[index])
+        if tag is None:
+            return self.turn_lower(index)
+        if self.has_inner_tag(index):
+            return self.turn(index).replace(tag, '').strip().lower()
+        return self.turn_lower(index)[len(tag):].strip()
+    
+    def is_key_question(self, index):
+        return (KEY_QUESTION in self.turn_lower(index)
+                and self.transcript.count('bot:', self.bounds[2 * index], self.bounds[2 * index + 1]) > 0)
+    
+    def client_response(self):
+        if self.key_question_index < 0:
+            return ""
+        
+        answers = []
+        for index in range(self.key_question_index + 1, len(self.speakers)):
+            if self.speakers[index] != SPEAKER_HUMAN or self.is_key_question(index):
+                continue
+            answer = self.text(index)
+            if len(answer) > 1:
+                answers.append(answer)
+        
+        return " ".join(answers)
+    
+    def non_empty_turns(self):
+        return [self.turn(index) for index in range(len(self.speakers))
+                if self.bounds[2 * index] < self.bounds[2 * index + 1]]
@@ -0,0 +1,105 @@
+import re
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+def phrase_pattern(phrases, whole_word=False, patterns=()):
+    alternatives = '|'.join([re.escape(phrase) for phrase in phrases] + list(patterns))
+    if whole_word:
+        return re.compile(rf'\b(?:{alternatives})\b')
+    return re.compile(alternatives)
+
+
+def _is_word(ch):
+    return ch.isalnum() or ch == '_'
+
+
+def _is_boundary(text, position):
+    before = position > 0 and _is_word(text[position - 1])
+    after = position < len(text) and _is_word(text[position])
+    return before != after
+
+
+class PhraseMatcher:
+    def __init__(self, phrase_sets, whole_word=(), pattern_sets=None):
+        self.patterns = []
+        keywords = {}
+        
+        for phrase_class, phrases in phrase_sets.items():
+            for phrase in phrases:
+                self.patterns.append((phrase_class, phrase_class in whole_word))
+                keywords.setdefault(phrase, []).append(len(self.patterns) - 1)
+                
+        self.regexes = [(phrase_class, phrase_pattern((), patterns=patterns), phrase_pattern((), phrase_class in whole_word, patterns))
+                        for phrase_class, patterns in (pattern_sets or {}).items() if patterns]
+        
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword, pattern_ids in keywords.items():
+                self._automaton.add_word(keyword, (len(keyword), tuple(pattern_ids)))
+            self._automaton.make_automaton()
+            self._iter = self._automaton.iter
+        else:
+            self._build_automaton(keywords)
+            self._iter = self._iter_python
+    
+    def scan(self, text):
+        hits = set()
+        
+        for end, (length, pattern_ids) in self._iter(text):
+            start = end - length + 1
+            for pattern_id in pattern_ids:
+                phrase_class, whole_word = self.patterns[pattern_id]
+                if phrase_class in hits:
+                    continue
+                
+                if whole_word and not (_is_boundary(text, start) and _is_boundary(text, end + 1)):
+                    continue
+                
+                hits.add(phrase_class)
+        
+        for phrase_class, prefilter, regex in self.regexes:
+            if phrase_class not in hits and prefilter.search(text) and regex.search(text):
+                hits.add(phrase_class)
+        
+        return hits
+    
+    def _build_automaton(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        
+        for keyword, pattern_ids in keywords.items():
+            state = 0
+            for ch in keyword:
+                if ch not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][ch] = len(self._goto) - 1
+                state = self._goto[state][ch]
+            self._output[state].append((len(keyword), tuple(pattern_ids)))
+        
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+    
+    def _iter_python(self, text):
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        
+        for position, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for match in output[state]:
+                yield position, match
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import sqlite3
+import numpy as np
+from config import *
+
+WRONG_PERSON_REASON = "Неправильный собеседник"
+CHURN_STATUSES = ["угроза оттока подтверждена", "угроза оттока не подтверждена"]
+
+RULE_GROUPS = {
+    'wrong_person': [WRONG_PERSON_PHRASES],
+    'prompts': [CRITICAL_PROMPTS, DIALOG_PROBLEM_PHRASES],
+    'client_response': [KEY_QUESTION, POSITIVE_PHRASES, NEGATIVE_PHRASES, UNCLEAR_PHRASES, UNCLEAR_PATTERNS,
+                        DEFINITE_POSITIVE_ANSWERS, DEFINITE_NEGATIVE_ANSWERS],
+    'critical_questions': [CRITICAL_QUESTIONS, BOT_DODGE_MARKERS]
+}
+
+
+class ResultStore:
+    def __init__(self, path=RESULT_STORE_FILE):
+        self.path = path
+        self.fingerprints = {
+            group: _fingerprint([ANALYSIS_RULES_VERSION, group, rules])
+            for group, rules in RULE_GROUPS.items()
+        }
+        self._rules_keys = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            "row_key TEXT PRIMARY KEY, reason TEXT, rule_groups TEXT NOT NULL, rules_key TEXT NOT NULL)"
+        )
+    
+    def row_keys(self, df, columns):
+        values = [df[columns[role]] if columns[role] else [''] * len(df)
+                  for role in ('client', 'transcript', 'status', 'result', 'prompts')]
+        return [_row_key(row) for row in zip(*values)]
+    
+    def lookup(self, keys):
+        found = np.zeros(len(keys), dtype=bool)
+        reasons = np.full(len(keys), None, dtype=object)
+        positions = {key: i for i, key in enumerate(keys)}
+        
+        unique_keys = list(positions)
+        for start in range(0, len(unique_keys), 500):
+            batch = unique_keys[start:start + 500]
+            rows = self.connection.execute(
+                f"SELECT row_key, reason, rule_groups, rules_key FROM verdicts WHERE row_key IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            for key, reason, groups, rules_key in rows:
+                if rules_key != self._rules_key(groups):
+                    self.stale += 1
+                    continue
+                found[positions[key]] = True
+                reasons[positions[key]] = reason
+        
+        if len(positions) < len(keys):
+            for i, key in enumerate(keys):
+                found[i], reasons[i] = found[positions[key]], reasons[positions[key]]
+        
+        self.hits += int(found.sum())
+        self.misses += int(len(keys) - found.sum())
+        return found, reasons
+    
+    def save(self, keys, df, columns, reasons, fresh):
+        status = df[columns['status']].to_numpy(dtype=object)
+        prompts = df[columns['prompts']].to_numpy(dtype=object) if columns['prompts'] else None
+        
+        records = []
+        for i in np.flatnonzero(fresh):
+            groups = self._rule_groups(str(status[i]), str(prompts[i]) if prompts is not None else '', reasons[i])
+            records.append((keys[i], reasons[i], groups, self._rules_key(groups)))
+        
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO verdicts (row_key, reason, rule_groups, rules_key) VALUES (?, ?, ?, ?)",
+                records
+            )
+    
+    def close(self):
+        self.connection.close()
+    
+    def _rule_groups(self, status, prompts, reason):
+        if reason == WRONG_PERSON_REASON:
+            return 'wrong_person'
+        
+        groups = ['wrong_person']
+        if prompts:
+            groups.append('prompts')
+        status_lower = status.lower()
+        if any(churn_status in status_lower for churn_status in CHURN_STATUSES):
+            groups.append('client_response')
+        groups.append('critical_questions')
+        return ','.join(groups)
+    
+    def _rules_key(self, groups):
+        if groups not in self._rules_keys:
+            self._rules_keys[groups] = _fingerprint([self.fingerprints.get(group) for group in groups.split(',')])
+        return self._rules_keys[groups]
+
+
+def _row_key(values):
+    return hashlib.sha256('\x1f'.join(str(value) for value in values).encode('utf-8')).hexdigest()
+
+
+def _fingerprint(values):
+    return hashlib.sha256(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
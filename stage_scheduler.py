@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from config import STAGE_WORKERS
+from instrumentation import metrics
+
+
+class StageScheduler:
+    def __init__(self, max_workers=STAGE_WORKERS):
+        self.max_workers = max_workers
+        self.stages = {}
+        self.results = {}
+        self.errors = {}
+        self.skipped = []
+        self.durations = {}
+        self.wall_seconds = 0.0
+    
+    def add(self, name, function, requires=()):
+        if name in self.stages:
+            raise ValueError(f"Этап '{name}' уже добавлен")
+        unknown = [stage for stage in requires if stage not in self.stages]
+        if unknown:
+            raise ValueError(f"Этап '{name}' зависит от неизвестных этапов: {unknown}")
+        self.stages[name] = (function, tuple(requires))
+    
+    def run(self):
+        waiting = dict(self.stages)
+        running = {}
+        workers = 1 if metrics.profile else max(1, min(self.max_workers, len(waiting)))
+        start = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage") as executor:
+            while waiting or running:
+                for name, (function, requires) in list(waiting.items()):
+                    failed = [stage for stage in requires if not self._available(stage)]
+                    if failed:
+                        del waiting[name]
+                        self.skipped.append(name)
+                        print(f"Этап '{name}' пропущен: нет результатов этапов {failed}")
+                    elif all(stage in self.results for stage in requires):
+                        del waiting[name]
+                        inputs = [self.results[stage] for stage in requires]
+                        running[executor.submit(self._run_stage, name, function, inputs)] = name
+                
+                if not running:
+                    break
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as e:
+                        self.errors[name] = e
+                        print(f"Ошибка на этапе '{name}': {e}")
+        
+        self.wall_seconds = time.perf_counter() - start
+        print(f"Этапы выполнены за {self.wall_seconds:.1f} с "
+              f"(сумма по этапам {sum(self.durations.values()):.1f} с, потоков: {workers})")
+        return self.results
+    
+    def _available(self, stage):
+        if stage in self.errors or stage in self.skipped:
+            return False
+        return stage not in self.results or self.results[stage] is not None
+    
+    def _run_stage(self, name, function, inputs):
+        start = time.perf_counter()
+        try:
+            return function(*inputs)
+        finally:
+            self.durations[name] = time.perf_counter() - start
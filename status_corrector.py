@@ -0,0 +1,96 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from config import CORRECTION_RULES, CORRECTION_RULES_FILE, UNCHANGED_REASON, ROW_KEY_COLUMN
+
+RULE_FIELDS = ['category', 'status', 'result', 'reason']
+
+
+def load_correction_rules(path=CORRECTION_RULES_FILE):
+    if not path or not os.path.exists(path):
+        return CORRECTION_RULES
+    
+    try:
+        if path.endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                rules = json.load(f)
+        elif path.endswith('.csv'):
+            rules = pd.read_csv(path, dtype=str).to_dict('records')
+        else:
+            rules = pd.read_excel(path, dtype=str).to_dict('records')
+        
+        rules = [{key: value for key, value in rule.items() if not pd.isna(value)} for rule in rules]
+        missing = [field for rule in rules for field in RULE_FIELDS if field not in rule]
+        if missing:
+            raise ValueError(f"не заполнены поля {sorted(set(missing))}")
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Ошибка загрузки правил коррекции {path}: {e}")
+        print("Используются правила по умолчанию")
+        return CORRECTION_RULES
+    
+    print(f"Загружено правил коррекции: {len(rules)} из {path}")
+    return rules
+
+
+class StatusCorrector:
+    def __init__(self, rules=None):
+        self.rules = load_correction_rules() if rules is None else rules
+    
+    def correct(self, df):
+        codes, categories = pd.factorize(df['Категория ошибки'])
+        category_codes = {category: code for code, category in enumerate(categories)}
+        status = df['Статус'].to_numpy(dtype=object)
+        result = df['Result'].to_numpy(dtype=object)
+        
+        status_text = None
+        contains = {}
+        conditions = []
+        for rule in self.rules:
+            condition = codes == category_codes.get(rule['category'], -2)
+            
+            substring = rule.get('status_contains')
+            if substring:
+                if substring not in contains:
+                    if status_text is None:
+                        status_text = [str(text).lower() for text in status]
+                    needle = substring.lower()
+                    contains[substring] = np.fromiter((needle in text for text in status_text), dtype=bool, count=len(status_text))
+                condition &= contains[substring]
+            
+            conditions.append(condition)
+        
+        transcript = df['call_transcript']
+        if transcript.hasnans:
+            transcript = transcript.fillna('nan')
+        
+        corrections = pd.DataFrame({
+            'Номер клиента': df['Номер клиента'].reset_index(drop=True),
+            'Было_статус': df['Статус'].reset_index(drop=True),
+            'Стало_статус': self._select(conditions, 'status', status),
+            'Было_result': df['Result'].reset_index(drop=True),
+            'Стало_result': self._select(conditions, 'result', result),
+            'Тип_ошибки': df['Категория ошибки'].reset_index(drop=True),
+            'Причина_коррекции': self._select(conditions, 'reason', np.full(len(df), UNCHANGED_REASON, dtype=object)),
+            'call_transcript': transcript.reset_index(drop=True)
+        })
+        
+        if ROW_KEY_COLUMN in df.columns:
+            corrections.insert(1, ROW_KEY_COLUMN, df[ROW_KEY_COLUMN].to_numpy())
+        
+        return corrections
+    
+    def correct_one(self, category, status, result):
+        for rule in self.rules:
+            if rule['category'] != category:
+                continue
+            substring = rule.get('status_contains')
+            if substring and substring.lower() not in str(status).lower():
+                continue
+            return rule['status'], rule['result'], rule['reason']
+        return status, result, UNCHANGED_REASON
+    
+    def _select(self, conditions, field, default):
+        if not conditions:
+            return default
+        return np.select(conditions, [np.array(rule[field], dtype=object) for rule in self.rules], default=default)
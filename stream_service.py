@@ -0,0 +1,355 @@
+import argparse
+import collections
+import contextlib
+import json
+import queue
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from config import STREAM_MAX_BATCH, STREAM_MAX_WAIT_MS, STREAM_HOST, STREAM_PORT, ERROR_RATE_STREAM_WINDOW
+from dialog_reader import iter_dialog_chunks, resolve_columns
+from error_rate_aggregator import ErrorRateAggregator, format_alert
+from improved_analyzer import DoubleCheckAnalyzer
+from instrumentation import metrics
+from status_corrector import StatusCorrector
+
+LATENCY_WINDOW = 10000
+CLASSIFY_PATH = "/classify"
+STATS_PATH = "/stats"
+INVALID_RECORD = "ожидается JSON-объект с полями диалога"
+MISSING_FIELDS = "нет необходимых полей: статус, result, транскрипт и номер клиента"
+WARM_UP_RECORD = {
+    'Номер клиента': 0,
+    'Статус': "угроза оттока подтверждена",
+    'result': "отказ - нет",
+    'call_transcript': "bot: Мы заметили снижение трафика. Планируете ли вы пользоваться услугами?; human: да, конечно, будем"
+}
+
+
+class ClassificationService:
+    def __init__(self, max_batch=STREAM_MAX_BATCH, max_wait_ms=STREAM_MAX_WAIT_MS):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.analyzer = DoubleCheckAnalyzer()
+        self.corrector = StatusCorrector()
+        self._columns = {}
+        self.stats = {'dialogs': 0, 'errors_found': 0, 'statuses_corrected': 0, 'invalid': 0, 'batches': 0}
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.error_rates = ErrorRateAggregator(window=ERROR_RATE_STREAM_WINDOW, on_alert=self._alert)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def start(self):
+        self._classify_record(WARM_UP_RECORD)
+        self.analyzer.rule_engine.flush()
+        self._thread = threading.Thread(target=self._run, name="classification", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+    
+    def submit(self, record):
+        future = Future()
+        self._queue.put((record, time.perf_counter(), future))
+        return future
+    
+    def classify(self, records):
+        futures = [self.submit(record) for record in records]
+        return [future.result() for future in futures]
+    
+    def classify_batch(self, records):
+        verdicts = [self._classify_record(record) if isinstance(record, dict) else {'error': INVALID_RECORD}
+                    for record in records]
+        metrics.add_rule_stats(self.analyzer.rule_engine.flush())
+        metrics.add_rule_hits([verdict.get('reason') for verdict in verdicts])
+        return verdicts
+    
+    def _classify_record(self, record):
+        keys = tuple(record)
+        if keys not in self._columns:
+            self._columns[keys] = resolve_columns(keys)
+        columns = self._columns[keys]
+        if columns is None:
+            return {'error': MISSING_FIELDS}
+        
+        status, result = self._value(record, columns['status']), self._value(record, columns['result'])
+        transcript = self._value(record, columns['transcript'])
+        prompts = self._value(record, columns['prompts']) if columns['prompts'] else ''
+        reason, category = self.analyzer.analyze_dialog(_text(status), _text(result), _text(transcript), _text(prompts))
+        
+        verdict = {
+            'client': self._value(record, columns['client']),
+            'misclassified': reason is not None,
+            'status': status,
+            'result': result,
+            'corrected_status': status,
+            'corrected_result': result
+        }
+        if reason is not None:
+            corrected_status, corrected_result, _ = self.corrector.correct_one(category, status, result)
+            verdict.update({
+                'reason': reason,
+                'category': category,
+                'corrected_status': corrected_status,
+                'corrected_result': corrected_result
+            })
+        return verdict
+    
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+            latencies = np.array(self.latencies, dtype=float)
+            self.error_rates.advance(time.time())
+            error_rates = self.error_rates.report()
+        
+        stats['mean_batch_size'] = round((stats['dialogs'] + stats['invalid']) / stats['batches'], 2) if stats['batches'] else 0
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            stats['latency_ms'] = {'p50': round(p50, 3), 'p95': round(p95, 3), 'p99': round(p99, 3),
+                                   'max': round(latencies.max(), 3)}
+        stats['error_rates'] = {
+            'window_seconds': error_rates['window'],
+            'sliding': error_rates['sliding'],
+            'alerts': error_rates['alerts'][-10:]
+        }
+        return stats
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            
+            self._process(batch)
+    
+    def _process(self, batch):
+        records, received, futures = zip(*batch)
+        try:
+            verdicts = self.classify_batch(records)
+        except Exception as e:
+            verdicts = [{'error': f"ошибка классификации: {e}"} for _ in records]
+        
+        done, now = time.perf_counter(), time.time()
+        latencies = [(done - start) * 1000 for start in received]
+        
+        with self._lock:
+            self.stats['batches'] += 1
+            for verdict in verdicts:
+                if 'error' in verdict:
+                    self.stats['invalid'] += 1
+                    continue
+                self.stats['dialogs'] += 1
+                self.error_rates.add(now, verdict.get('category'))
+                self.stats['errors_found'] += verdict['misclassified']
+                self.stats['statuses_corrected'] += verdict['corrected_status'] != verdict['status']
+            self.latencies.extend(latencies)
+        
+        for verdict, latency, future in zip(verdicts, latencies, futures):
+            verdict['latency_ms'] = round(latency, 3)
+            future.set_result(verdict)
+    
+    def _alert(self, alert):
+        start, end = (time.strftime('%H:%M:%S', time.localtime(alert[key])) for key in ('start', 'end'))
+        print(format_alert({**alert, 'start': start, 'end': end}), file=sys.stderr)
+    
+    def _value(self, record, column):
+        value = record.get(column)
+        return None if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)) else value
+
+
+def _text(value):
+    return 'nan' if value is None else str(value)
+
+
+def parse_record(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def serve_lines(service, lines, write):
+    pending = queue.Queue()
+    
+    def drain():
+        while True:
+            future = pending.get()
+            if future is None:
+                return
+            write(json.dumps(future.result(), ensure_ascii=False, default=str) + "\n")
+    
+    writer = threading.Thread(target=drain, name="verdicts", daemon=True)
+    writer.start()
+    
+    for line in lines:
+        if line.strip():
+            pending.put(service.submit(parse_record(line)))
+    
+    pending.put(None)
+    writer.join()
+
+
+class LineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        serve_lines(self.server.service, (line.decode('utf-8') for line in self.rfile), self._write)
+    
+    def _write(self, text):
+        self.wfile.write(text.encode('utf-8'))
+
+
+class ClassificationSocketServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    
+    def __init__(self, service, host=STREAM_HOST, port=STREAM_PORT):
+        super().__init__((host, port), LineHandler)
+        self.service = service
+
+
+class ClassificationHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def __init__(self, service, host=STREAM_HOST, port=STREAM_PORT):
+        super().__init__((host, port), ClassificationHandler)
+        self.service = service
+
+
+class ClassificationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        if self.path == STATS_PATH:
+            self._send(200, self.server.service.report())
+        else:
+            self._send(404, {'message': 'Not found'})
+    
+    def do_POST(self):
+        if self.path != CLASSIFY_PATH:
+            self._send(404, {'message': 'Not found'})
+            return
+        
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = [parse_record(line) for line in body.splitlines() if line.strip()]
+        
+        if isinstance(payload, list):
+            self._send(200, self.server.service.classify(payload))
+        else:
+            self._send(200, self.server.service.classify([payload])[0])
+    
+    def _send(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def replay(service, path, rate=0.0, limit=None):
+    futures = []
+    interval = 1 / rate if rate > 0 else 0.0
+    start = time.perf_counter()
+    
+    for chunk in iter_dialog_chunks(path):
+        for record in chunk.to_dict('records'):
+            if limit is not None and len(futures) >= limit:
+                break
+            if interval:
+                time.sleep(max(0.0, start + len(futures) * interval - time.perf_counter()))
+            futures.append(service.submit(record))
+    
+    verdicts = [future.result() for future in futures]
+    return verdicts, time.perf_counter() - start
+
+
+def print_report(report, file=sys.stdout):
+    print("Статистика сервиса классификации:", file=file)
+    print(f"    Диалогов: {report['dialogs']:,} (некорректных записей: {report['invalid']:,})", file=file)
+    print(f"    Ошибок классификации: {report['errors_found']:,}, статусов исправлено: {report['statuses_corrected']:,}", file=file)
+    print(f"    Пакетов: {report['batches']:,}, средний размер пакета: {report['mean_batch_size']}", file=file)
+    if 'latency_ms' in report:
+        latency = report['latency_ms']
+        print(f"    Задержка, мс: p50 {latency['p50']}, p95 {latency['p95']}, p99 {latency['p99']}, max {latency['max']}", file=file)
+    sliding = report['error_rates']['sliding']
+    print(f"    Доля ошибок в скользящем окне: {sliding['error_rate']:.1%} ({sliding['errors']:,} из {sliding['dialogs']:,}), "
+          f"всплесков: {len(report['error_rates']['alerts'])}", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Потоковая классификация диалогов: JSON lines на входе, вердикт на выходе")
+    parser.add_argument('mode', nargs='?', choices=['stdin', 'socket', 'http', 'replay'], default='stdin')
+    parser.add_argument('--input', help="файл диалогов для режима replay (xlsx, csv или parquet)")
+    parser.add_argument('--rate', type=float, default=0.0, help="диалогов в секунду для replay, 0 - без ограничения")
+    parser.add_argument('--limit', type=int, help="сколько диалогов отправить в replay")
+    parser.add_argument('--host', default=STREAM_HOST)
+    parser.add_argument('--port', type=int, default=STREAM_PORT)
+    parser.add_argument('--max-batch', type=int, default=STREAM_MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=STREAM_MAX_WAIT_MS)
+    args = parser.parse_args()
+    
+    log = sys.stderr if args.mode == 'stdin' else sys.stdout
+    with contextlib.redirect_stdout(log):
+        service = ClassificationService(args.max_batch, args.max_wait_ms).start()
+    
+    try:
+        if args.mode == 'stdin':
+            serve_lines(service, sys.stdin, _write_stdout)
+        elif args.mode == 'replay':
+            if not args.input:
+                parser.error("для режима replay нужен --input")
+            verdicts, seconds = replay(service, args.input, args.rate, args.limit)
+            print(f"Отправлено диалогов: {len(verdicts):,} за {seconds:.2f} с ({len(verdicts) / seconds:,.0f} диалогов/с)")
+        else:
+            server_class = ClassificationSocketServer if args.mode == 'socket' else ClassificationHTTPServer
+            server = server_class(service, args.host, args.port)
+            host, port = server.server_address[:2]
+            if args.mode == 'socket':
+                print(f"Сервис классификации слушает {host}:{port} (JSON lines)")
+            else:
+                print(f"Сервис классификации запущен: http://{host}:{port}{CLASSIFY_PATH} (статистика: {STATS_PATH})")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+    finally:
+        service.stop()
+        print_report(service.report(), file=log)
+
+
+def _write_stdout(text):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
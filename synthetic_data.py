@@ -0,0 +1,203 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from config import ANALYSIS_CHUNK_SIZE, CRITICAL_QUESTIONS, DIALOG_PROBLEM_PHRASES, WRONG_PERSON_PHRASES, EXCEL_MAX_ROWS
+
+COLUMNS = ['Номер клиента', 'result', 'Статус ', 'Верный статус (нужно заполнить)', 'call_transcript',
+           'длительность', 'call_status', 'prompts_statistics']
+
+GREETINGS = [
+    "bot: Добрый день! Это компания t2, корпоративный отдел, Ольга. Минуту уделите, пожалуйста?",
+    "bot: Добрый день! Компания t2, меня зовут Ольга. Звоню по корпоративному договору, меня хорошо слышно?"
+]
+HUMAN_GREETINGS = ["human: алло", "human: да слушаю", "human: я слушаю", "human: алло да здравствуйте",
+                   "human: удобно говорите"]
+INTRODUCTION = ("bot: У меня короткий вопрос по вашему договору, буквально минута.; "
+                "bot: Дело в том, что мы заметили снижение трафика по вашему контракту.")
+KEY_QUESTIONS = [
+    "bot: Подскажите, пожалуйста, планируете ли вы пользоваться нашими услугами дальше?",
+    "bot: Вы планируете пользоваться услугами t2 дальше?"
+]
+CLOSINGS = [
+    "bot: Спасибо за уделенное время! До свидания.",
+    ("bot: Очень жаль это слышать. Передам информацию вашему менеджеру для детального анализа текущих "
+     "условий по договору.; bot: Спасибо за уделенное время"),
+    ("bot: Думаю, мы сможем предложить вам выгодные условия. Я передам вашему персональному менеджеру, "
+     "чтобы он подобрал для вас подходящие тарифы.; bot: Спасибо за уделенное время")
+]
+
+ANSWERS = {
+    'agree': ["human: да планируем", "human: да, конечно будем пользоваться", "human: конечно будем",
+              "human: да остаёмся", "human: естественно продолжаем"],
+    'refuse': ["human: нет не планируем", "human: нет, уходим к другому оператору", "human: не будем",
+               "human: мы отказываемся", "human: больше не буду пользоваться"],
+    'unclear': ["human: ну... не знаю", "human: пока не могу сказать", "human: не уверен",
+                "human: сомневаюсь если честно", "human: надо подумать"],
+    'other': ["human: а сколько процентов то", "human: перезвоните позже", "human: отправьте на почту"]
+}
+
+SCENARIOS = ['missed', 'agree', 'refuse', 'unclear', 'other', 'wrong_person', 'bad_connection', 'critical_question']
+SCENARIO_WEIGHTS = [0.19, 0.27, 0.13, 0.12, 0.16, 0.01, 0.10, 0.02]
+
+STATUS_BY_SCENARIO = {
+    'agree': "угроза оттока не подтверждена",
+    'refuse': "угроза оттока подтверждена",
+    'unclear': "угроза оттока не определена",
+    'other': "угроза оттока не определена, требуется уточнение персонального менеджера",
+    'wrong_person': "обновить контактные данные",
+    'bad_connection': "угроза оттока не определена",
+    'critical_question': "негатив клиента от звонка"
+}
+WRONG_STATUS = {
+    'agree': "угроза оттока подтверждена",
+    'refuse': "угроза оттока не подтверждена",
+    'unclear': "угроза оттока подтверждена",
+    'wrong_person': "угроза оттока не подтверждена",
+    'critical_question': "угроза оттока подтверждена"
+}
+RESULT_BY_SCENARIO = {
+    'missed': ["недозвон", "автоответчик", "тишина"],
+    'agree': ["согласие"],
+    'refuse': ["отказ - нет", "больше не звонить"],
+    'unclear': ["отказ - не знает", "отказ - сомневается"],
+    'other': ["сброс на предложении", "отказ - возражение без конкретики"],
+    'wrong_person': ["ошиблись номером", "сброс на предложении"],
+    'bad_connection': ["проблемы с распознаванием"],
+    'critical_question': ["отказ - возражение без конкретики", "сброс на предложении"]
+}
+CALL_STATUSES = ["480 Temporarily Unavailable", "487 Request Terminated", "404 Not Found", "486 Busy Here"]
+
+BASE_PROMPTS = ["hello_main, hello_wrong_time, clarification_main",
+                "hello_main, hello_thanks, clarification_main, clarification_main_tail",
+                "hello_main, hello_default, clarification_main"]
+TAIL_PROMPTS = ["clarification_objection", "clarification_to_think, final_hangup", "final_hangup",
+                "clarification_what_company, clarification_tail_1"]
+PROBLEM_PROMPTS = ["clarification_null_1", "clarification_default_1", "clarification_dont_understand"]
+
+
+def generate_dialogs(rows, chunk_size=ANALYSIS_CHUNK_SIZE, seed=0, mislabel_rate=0.15):
+    rng = np.random.default_rng(seed)
+    
+    for start in range(0, rows, chunk_size):
+        yield _generate_chunk(rng, start, min(chunk_size, rows - start), mislabel_rate)
+
+
+def _generate_chunk(rng, start, size, mislabel_rate):
+    scenarios = rng.choice(len(SCENARIOS), size=size, p=SCENARIO_WEIGHTS)
+    mislabeled = rng.random(size) < mislabel_rate
+    picks = rng.integers(0, 1 << 30, size=(size, 6))
+    
+    records = [_generate_row(SCENARIOS[scenario], mislabel, pick)
+               for scenario, mislabel, pick in zip(scenarios, mislabeled, picks)]
+    frame = pd.DataFrame(records, columns=['result', 'Статус ', 'call_transcript', 'call_status',
+                                           'prompts_statistics'])
+    
+    frame.insert(0, 'Номер клиента', np.arange(start + 1, start + size + 1, dtype=np.int64) + 1000000)
+    frame.insert(3, 'Верный статус (нужно заполнить)', np.nan)
+    frame.insert(5, 'длительность', np.where(scenarios == 0, 0, rng.integers(8, 120, size=size)))
+    return frame[COLUMNS]
+
+
+def _generate_row(scenario, mislabel, pick):
+    result = _choose(RESULT_BY_SCENARIO[scenario], pick[0])
+    
+    if scenario == 'missed':
+        status = "недозвон"
+        return result, status, np.nan, _choose(CALL_STATUSES, pick[1]), np.nan
+    
+    status = WRONG_STATUS.get(scenario, STATUS_BY_SCENARIO[scenario]) if mislabel else STATUS_BY_SCENARIO[scenario]
+    turns = [_choose(GREETINGS, pick[1])]
+    prompts = [_choose(BASE_PROMPTS, pick[2])]
+    
+    if scenario == 'wrong_person':
+        turns.append(f"human: {_choose(WRONG_PERSON_PHRASES, pick[3])}")
+        turns.append(INTRODUCTION)
+    elif scenario == 'bad_connection':
+        turns.append(f"human: алло {_choose(DIALOG_PROBLEM_PHRASES, pick[3])}")
+        turns.append(INTRODUCTION)
+        turns.append("human: что что")
+        prompts.append(_choose(PROBLEM_PROMPTS, pick[4]))
+        if pick[5] % 2:
+            prompts.append(_choose(PROBLEM_PROMPTS, pick[5] // 2))
+    elif scenario == 'critical_question':
+        turns.append(_choose(HUMAN_GREETINGS, pick[3]))
+        turns.append("bot: У меня короткий вопрос по вашему договору, буквально минута.")
+        turns.append(f"human: а {_choose(CRITICAL_QUESTIONS, pick[4])}")
+        turns.append("bot: Дело в том, что мы заметили снижение трафика по вашему контракту.")
+    else:
+        turns.append(_choose(HUMAN_GREETINGS, pick[3]))
+        turns.append(INTRODUCTION)
+    
+    if scenario in ANSWERS or scenario == 'critical_question':
+        turns.append(_choose(KEY_QUESTIONS, pick[4]))
+        turns.append(_choose(ANSWERS.get(scenario, ANSWERS['other']), pick[5]))
+    
+    turns.append(_choose(CLOSINGS, pick[0]))
+    prompts.append(_choose(TAIL_PROMPTS, pick[1]))
+    
+    return result, status, "; ".join(turns), "200 OK", ", ".join(prompts)
+
+
+def _choose(options, value):
+    return options[int(value) % len(options)]
+
+
+def write_dialogs(path, rows, chunk_size=ANALYSIS_CHUNK_SIZE, seed=0, mislabel_rate=0.15):
+    extension = os.path.splitext(path)[1].lower()
+    chunks = generate_dialogs(rows, chunk_size, seed, mislabel_rate)
+    
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    if extension == '.csv':
+        for number, chunk in enumerate(chunks):
+            chunk.to_csv(path, mode='w' if number == 0 else 'a', header=number == 0, index=False)
+    elif extension == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                        for field in table.schema]).remove_metadata()
+                    writer = pq.ParquetWriter(path, schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        if rows > EXCEL_MAX_ROWS:
+            raise ValueError(f"В xlsx помещается не больше {EXCEL_MAX_ROWS:,} строк, используйте .parquet или .csv")
+        _write_excel(path, chunks)
+
+
+def _write_excel(path, chunks):
+    from openpyxl import Workbook
+    
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(COLUMNS)
+    for chunk in chunks:
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append([None if isinstance(value, float) and np.isnan(value) else value for value in row])
+    workbook.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетического файла с диалогами")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--output', default="data/synthetic_dialogs.xlsx", help="путь к .xlsx, .parquet или .csv")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mislabel-rate', type=float, default=0.15, help="доля диалогов с неверным статусом")
+    args = parser.parse_args()
+    
+    write_dialogs(args.output, args.rows, seed=args.seed, mislabel_rate=args.mislabel_rate)
+    print(f"Создан файл: {args.output} ({args.rows:,} диалогов)")
+
+
+if __name__ == "__main__":
+    main()
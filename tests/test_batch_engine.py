@@ -0,0 +1,60 @@
+import os
+import pandas as pd
+import pytest
+from improved_analyzer import DoubleCheckAnalyzer
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data',
+                         'Файл с транскибированными диалогами.xlsx')
+WRONG_PERSON = 'Неправильный собеседник'
+
+
+def analyze(dialogs, engine):
+    return DoubleCheckAnalyzer().first_pass_analysis(dialogs, engine=engine, workers=1, incremental=False)
+
+
+def assert_engines_match(dialogs):
+    final_rows, detailed_rows = analyze(dialogs, 'rows')
+    final_batch, detailed_batch = analyze(dialogs, 'batch')
+    pd.testing.assert_frame_equal(final_rows, final_batch)
+    pd.testing.assert_frame_equal(detailed_rows, detailed_batch)
+    return final_batch
+
+
+def make_dialogs(transcripts):
+    return pd.DataFrame({
+        'Номер клиента': range(1, len(transcripts) + 1),
+        'result': 'отказ - нет',
+        'Статус ': 'угроза оттока подтверждена',
+        'call_transcript': transcripts,
+        'длительность': 30,
+        'call_status': '200 OK',
+        'prompts_statistics': 'hello_main'
+    })
+
+
+@pytest.fixture(scope='module')
+def workbook():
+    return pd.read_excel(DATA_FILE)
+
+
+def test_batch_engine_matches_rows_engine_on_workbook(workbook):
+    final_results = assert_engines_match(workbook)
+    
+    assert len(final_results) == 1501
+    assert (final_results['Категория ошибки'] == WRONG_PERSON).sum() == 36
+
+
+@pytest.mark.parametrize('transcript, wrong_person', [
+    ("bot: Добрый день!; human: я не являюсь председателем", True),
+    ("bot: Добрый день!; human: вы ошиблись номером.", True),
+    ("bot: Добрый день!; human: нет,не тот человек вам нужен", True),
+    ("bot: Добрый день!; human: Это Не Мой Договор", True),
+    ("bot: Добрый день!; human: я не председательница", False),
+    ("bot: Добрый день!; human: вашне мой договор", False),
+    ("bot: Добрый день!; human: не являюсьь", False)
+])
+def test_wrong_person_uses_cyrillic_word_boundaries(transcript, wrong_person):
+    final_results = assert_engines_match(make_dialogs([transcript]))
+    
+    found = len(final_results) > 0 and (final_results['Категория ошибки'] == WRONG_PERSON).any()
+    assert found == wrong_person
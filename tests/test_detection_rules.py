@@ -0,0 +1,46 @@
+import itertools
+from detection_rules import DetectionRule, RuleEngine, join_reasons
+
+
+class Context:
+    def __init__(self, found):
+        self.found = found
+        self.hits = set()
+
+
+def make_engine():
+    def rule(name, **options):
+        return DetectionRule(name, name, lambda context: name in context.found, **options)
+    
+    return RuleEngine([
+        rule('terminal', terminal=True),
+        rule('masking', masks=['masked']),
+        rule('masked'),
+        rule('plain')
+    ], reorder_interval=0)
+
+
+def test_masked_rules_are_skipped_after_a_masking_hit():
+    engine = make_engine()
+    engine.order = list(engine.rules)
+    
+    assert join_reasons(engine.evaluate(Context({'masking', 'masked', 'plain'}))) == "masking | plain"
+    assert join_reasons(engine.evaluate(Context({'terminal', 'masking', 'plain'}))) == "terminal"
+    assert engine.flush() == {
+        'terminal': {'evaluated': 2, 'skipped': 0, 'hits': 1, 'seconds': engine.rules[0].seconds},
+        'masking': {'evaluated': 1, 'skipped': 1, 'hits': 1, 'seconds': engine.rules[1].seconds},
+        'masked': {'evaluated': 0, 'skipped': 2, 'hits': 0, 'seconds': 0.0},
+        'plain': {'evaluated': 1, 'skipped': 1, 'hits': 1, 'seconds': engine.rules[3].seconds},
+    }
+
+
+def test_evaluation_order_does_not_change_reasons():
+    engine = make_engine()
+    contexts = [set(found) for size in range(5) for found in itertools.combinations(['terminal', 'masking', 'masked', 'plain'], size)]
+    expected = None
+    
+    for order in itertools.permutations(engine.rules):
+        engine.order = list(order)
+        reasons = [join_reasons(engine.evaluate(Context(found))) for found in contexts]
+        expected = expected or reasons
+        assert reasons == expected
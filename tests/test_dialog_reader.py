@@ -0,0 +1,18 @@
+import pytest
+from dialog_reader import DialogLoadError, guard_loading
+
+
+def broken_reader():
+    yield 1
+    raise ValueError("File is not a zip file")
+
+
+def test_reader_errors_become_load_errors():
+    with pytest.raises(DialogLoadError, match="not a zip file"):
+        list(guard_loading(broken_reader()))
+
+
+def test_consumer_errors_are_not_load_errors():
+    with pytest.raises(KeyError):
+        for chunk in guard_loading(iter([1, 2])):
+            raise KeyError(chunk)
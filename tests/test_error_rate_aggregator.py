@@ -0,0 +1,32 @@
+from error_rate_aggregator import ErrorRateAggregator
+
+
+def make_aggregator():
+    return ErrorRateAggregator(window=60, sliding_windows=3, spike_factor=2.0, spike_min_errors=2)
+
+
+def test_idle_gap_closes_empty_windows():
+    aggregator = make_aggregator()
+    for second in range(10):
+        aggregator.add(second, 'Неправильный собеседник' if second % 2 else None)
+    aggregator.add(130, None)
+    aggregator.advance(200)
+    
+    assert [(window['start'], window['dialogs']) for window in aggregator.series] == [(0, 10), (60, 0), (120, 1)]
+
+
+def test_stale_windows_leave_the_baseline_after_a_quiet_period():
+    aggregator = make_aggregator()
+    for second in range(10):
+        aggregator.add(second, 'Неправильный собеседник' if second % 2 else None)
+    aggregator.advance(600)
+    
+    assert aggregator.report()['sliding']['dialogs'] == 0
+    assert [window['start'] for window in aggregator.series] == [0, 420, 480, 540]
+    
+    for second in range(600, 604):
+        aggregator.add(second, 'Неправильный собеседник')
+    aggregator.advance(660)
+    
+    assert aggregator.alerts[-1]['start'] == 600
+    assert aggregator.alerts[-1]['baseline_rate'] == 0.0
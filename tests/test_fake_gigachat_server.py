@@ -0,0 +1,58 @@
+import pytest
+from ai import fake_gigachat_server
+from ai.fake_gigachat_server import FakeGigaChatServer
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fake_gigachat_server.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+    
+    def make(rate_limit):
+        server = FakeGigaChatServer(port=0, rate_limit=rate_limit)
+        servers.append(server)
+        return server
+    
+    yield make
+    for server in servers:
+        server.server_close()
+
+
+def test_rate_limit_below_one_request_per_second_admits_requests(clock, make_server):
+    server = make_server(0.5)
+    
+    admitted = []
+    for _ in range(6):
+        admitted.append(server.acquire())
+        clock.now += 1
+    
+    assert admitted == [True, False, True, False, True, False]
+
+
+def test_rate_limit_allows_burst_up_to_rate(clock, make_server):
+    server = make_server(2)
+    
+    assert [server.acquire() for _ in range(3)] == [True, True, False]
+    clock.now += 0.5
+    assert server.acquire()
+    assert not server.acquire()
+
+
+def test_zero_rate_limit_disables_limiting(clock, make_server):
+    server = make_server(0)
+    
+    assert all(server.acquire() for _ in range(100))
@@ -0,0 +1,34 @@
+from ai.fake_gigachat_server import FakeGigaChatServer
+from ai.gigachat_generator import GigaChatGenerator
+from ai.response_cache import ResponseCache
+
+EXAMPLE = ('Ложный отток (клиент соглашается)', 3, 10, ["bot: Планируете ли вы пользоваться услугами?; human: да"])
+
+
+def make_generator(cache_dir, server=None):
+    generator = GigaChatGenerator()
+    if server is not None:
+        generator.auth_url = server.auth_url
+        generator.api_url = server.api_url
+    generator.cache = ResponseCache(cache_dir=str(cache_dir))
+    return generator
+
+
+def test_cached_answers_are_keyed_by_endpoint(tmp_path, monkeypatch):
+    monkeypatch.setenv('GIGACHAT_CREDENTIALS', 'test-credentials')
+    monkeypatch.setattr(GigaChatGenerator, '_tokens', {})
+    
+    server = FakeGigaChatServer(latency=0, auth_latency=0).start()
+    try:
+        fake = make_generator(tmp_path, server)
+        answer = fake.generate_script(*EXAMPLE)
+    finally:
+        server.stop()
+    
+    real = make_generator(tmp_path)
+    data = real._build_request(*EXAMPLE)
+    
+    assert server.stats['completions'] == 1
+    assert fake.cache.get(fake._cache_key(data)) == answer
+    assert real.cache.get(real._cache_key(data)) is None
+    assert fake._cache_key(data) != real._cache_key(data)
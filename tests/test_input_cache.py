@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+import input_cache
+from input_cache import cached_dialog_chunks, read_dialog_chunks
+
+pytest.importorskip("pyarrow")
+
+
+def test_cached_chunks_only_after_analysis_pass(tmp_path, monkeypatch):
+    monkeypatch.setattr(input_cache, "INPUT_CACHE_DIR", str(tmp_path / "cache"))
+    path = str(tmp_path / "dialogs.xlsx")
+    pd.DataFrame({'ID звонка': ['1', '2'], 'Текст транскрибации': ['a', 'b']}).to_excel(path, index=False)
+    
+    assert cached_dialog_chunks(path, all_columns=True) is None
+    
+    loaded = pd.concat(read_dialog_chunks(path, all_columns=True), ignore_index=True)
+    cached = pd.concat(cached_dialog_chunks(path, all_columns=True), ignore_index=True)
+    pd.testing.assert_frame_equal(cached, loaded)
+
+
+def test_no_cache_for_csv(tmp_path):
+    path = str(tmp_path / "dialogs.csv")
+    pd.DataFrame({'ID звонка': ['1']}).to_csv(path, index=False)
+    assert cached_dialog_chunks(path) is None
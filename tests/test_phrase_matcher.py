@@ -0,0 +1,16 @@
+import pytest
+from phrase_matcher import PhraseMatcher, phrase_pattern
+
+
+@pytest.mark.parametrize("text, expected", [("язык c++ ", True), ("язык c ", False), ("язык cc ", False)])
+def test_plus_in_phrase_is_literal(text, expected):
+    matcher = PhraseMatcher({'lang': ['c++']})
+    assert ('lang' in matcher.scan(text)) is expected
+    assert bool(phrase_pattern(['c++']).search(text)) is expected
+
+
+@pytest.mark.parametrize("text, expected", [("нууу...да", True), ("ну...да", True), ("н...да", False), ("ну+...да", False)])
+def test_pattern_sets_match_like_phrase_pattern(text, expected):
+    matcher = PhraseMatcher({'unclear': ['не знаю']}, whole_word={'unclear'}, pattern_sets={'unclear': [r"ну+\.{3}"]})
+    assert ('unclear' in matcher.scan(text)) is expected
+    assert bool(phrase_pattern(['не знаю'], whole_word=True, patterns=[r"ну+\.{3}"]).search(text)) is expected
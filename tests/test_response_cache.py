@@ -0,0 +1,59 @@
+import os
+from ai import response_cache
+from ai.response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **options):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, 'time', clock)
+    return ResponseCache(cache_dir=str(tmp_path), **options), clock
+
+
+def test_hits_do_not_extend_ttl(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl=10, max_bytes=10 ** 6)
+    cache.put('a', 'ответ')
+    for _ in range(3):
+        clock.now += 4
+        cache.get('a')
+    cache.put('b', 'ответ')
+    
+    assert not os.path.exists(cache._path('a'))
+    assert cache.get('a') is None
+    assert cache.get('b') == 'ответ'
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl=3600, max_bytes=10 ** 6)
+    cache.put('a', 'x' * 100)
+    entry_size = os.path.getsize(cache._path('a'))
+    cache.max_bytes = entry_size * 2
+    clock.now += 1
+    cache.put('b', 'x' * 100)
+    clock.now += 1
+    cache.get('a')
+    cache.put('c', 'x' * 100)
+    
+    assert sorted(name[:-len('.json')] for name in os.listdir(tmp_path)) == ['a', 'c']
+    assert cache._bytes == entry_size * 2
+
+
+def test_index_is_loaded_from_disk_once(tmp_path, monkeypatch):
+    ResponseCache(cache_dir=str(tmp_path)).put('old', 'ответ')
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    listdir_calls = []
+    real_listdir = os.listdir
+    monkeypatch.setattr(response_cache.os, 'listdir', lambda path: listdir_calls.append(path) or real_listdir(path))
+    for number in range(20):
+        cache.put(str(number), 'ответ')
+    
+    assert len(listdir_calls) == 1
+    assert cache.get('old') == 'ответ'
+    assert cache._bytes == sum(os.path.getsize(os.path.join(tmp_path, name)) for name in real_listdir(tmp_path))
@@ -0,0 +1,19 @@
+from visualizer import BusinessVisualizer
+
+
+def test_priority_legend_matches_default_levels():
+    legend = BusinessVisualizer()._priority_legend()
+    assert [label for _, _, label in legend] == [
+        'Критический (≥5%)', 'Высокий (2-5%)', 'Средний (1-2%)', 'Низкий (<1%)'
+    ]
+    assert [color for _, color, _ in legend] == ['#FFB7C5', '#A2D2FF', '#BDE0FE', '#CDB4DB']
+
+
+def test_priority_legend_follows_custom_levels():
+    levels = [(10, 'A'), (0.5, 'B'), (0, 'C')]
+    legend = BusinessVisualizer()._priority_legend(levels, ['#111111', '#222222'])
+    assert legend == [
+        ('A', '#111111', 'A (≥10%)'),
+        ('B', '#222222', 'B (0.5-10%)'),
+        ('C', '#111111', 'C (<0.5%)'),
+    ]
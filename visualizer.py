@@ -1,30 +1,40 @@
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
 import os
+import json
+import hashlib
+from importlib.metadata import version
+from config import CHART_RENDER_MODE, CHART_DPI, CHART_FORMAT, CHART_CACHE_FILE, PRIORITY_LEVELS, PRIORITY_COLORS
+from error_rate_aggregator import priority_level
 
 class BusinessVisualizer:
-    def __init__(self):
+    def __init__(self, mode=CHART_RENDER_MODE, dpi=CHART_DPI, chart_format=CHART_FORMAT):
         self.pastel_colors = ['#FFB7C5', '#A2D2FF', '#BDE0FE', '#FFAFCC', '#CDB4DB']
-        
-        plt.style.use('default')
-        self.set_elegant_style()
+        self.mode = mode
+        self.dpi = dpi
+        self.chart_format = chart_format
+        self.charts_skipped = 0
+        self._style_applied = False
     
     def set_elegant_style(self):
-        plt.rcParams['figure.facecolor'] = '#FAFAFA'
-        plt.rcParams['axes.facecolor'] = '#FFFFFF'
-        plt.rcParams['grid.color'] = '#E0E0E0'
-        plt.rcParams['grid.alpha'] = 0.2
-        plt.rcParams['text.color'] = '#37474F'
-        plt.rcParams['axes.labelcolor'] = '#546E7A'
-        plt.rcParams['xtick.color'] = '#546E7A'
-        plt.rcParams['ytick.color'] = '#546E7A'
+        matplotlib = _load_matplotlib()
+        
+        matplotlib.rcParams['figure.facecolor'] = '#FAFAFA'
+        matplotlib.rcParams['axes.facecolor'] = '#FFFFFF'
+        matplotlib.rcParams['grid.color'] = '#E0E0E0'
+        matplotlib.rcParams['grid.alpha'] = 0.2
+        matplotlib.rcParams['text.color'] = '#37474F'
+        matplotlib.rcParams['axes.labelcolor'] = '#546E7A'
+        matplotlib.rcParams['xtick.color'] = '#546E7A'
+        matplotlib.rcParams['ytick.color'] = '#546E7A'
     
     def create_accuracy_analysis_chart(self, errors_df, total_dialogs, save_path="output/accuracy_analysis.png"):
         error_count = len(errors_df) if not errors_df.empty else 0
-        accuracy_percentage = ((total_dialogs - error_count) / total_dialogs) * 100
+        data = {'error_count': int(error_count), 'total_dialogs': int(total_dialogs)}
         
-        fig, ax = plt.subplots(figsize=(10, 6))
+        return self._render('accuracy_analysis', data, self._draw_accuracy_analysis, (10, 6), save_path)
+    
+    def _draw_accuracy_analysis(self, ax, data):
+        error_count, total_dialogs = data['error_count'], data['total_dialogs']
+        accuracy_percentage = ((total_dialogs - error_count) / total_dialogs) * 100
         
         sizes = [error_count, total_dialogs - error_count]
         labels = [f'Ошибки\n{error_count}', f'Корректные\n{total_dialogs - error_count}']
@@ -38,48 +48,34 @@ class BusinessVisualizer:
         
         ax.set_title(f'Точность классификации робота\n{accuracy_percentage:.1f}% диалогов обработано верно', 
                      fontsize=14, fontweight='bold', pad=20)
-        
-        plt.tight_layout()
-        plt.savefig(save_path, dpi=300, bbox_inches='tight', facecolor='#FAFAFA')
-        plt.close()
-        
-        return save_path
 
-    def create_error_priority_chart(self, errors_df, total_dialogs, save_path="output/error_priority.png"):
+    def create_error_priority_chart(self, errors_df, total_dialogs, save_path="output/error_priority.png", category_counts=None):
         if errors_df.empty:
             return None
         
-        error_counts = errors_df['Категория ошибки'].value_counts()
+        if category_counts is None:
+            category_counts = errors_df['Категория ошибки'].value_counts()
+        
+        priority_colors = {level: color for level, color, _ in self._priority_legend()}
         
         priority_data = []
-        for category, count in error_counts.items():
+        for category, count in category_counts.items():
             percentage = (count / total_dialogs) * 100
+            level = priority_level(percentage)
             
-            if percentage >= 5:
-                priority_level = "Критический"
-                color = self.pastel_colors[0]
-            elif percentage >= 2:
-                priority_level = "Высокий"
-                color = self.pastel_colors[1]
-            elif percentage >= 1:
-                priority_level = "Средний" 
-                color = self.pastel_colors[2]
-            else:
-                priority_level = "Низкий"
-                color = self.pastel_colors[4]
-                
             priority_data.append({
-                'Категория': category,
-                'Количество': count,
-                'Процент': percentage,
-                'Приоритет': priority_level,
-                'Цвет': color
+                'Категория': str(category),
+                'Количество': int(count),
+                'Процент': float(percentage),
+                'Приоритет': level,
+                'Цвет': priority_colors[level]
             })
         
         priority_data.sort(key=lambda x: x['Процент'], reverse=True)
         
-        fig, ax = plt.subplots(figsize=(14, 8))
+        return self._render('error_priority', priority_data, self._draw_error_priority, (14, 8), save_path)
         
+    def _draw_error_priority(self, ax, priority_data):
         categories = [f"{item['Категория']}" for item in priority_data]
         counts = [item['Количество'] for item in priority_data]
         colors = [item['Цвет'] for item in priority_data]
@@ -90,30 +86,118 @@ class BusinessVisualizer:
             ax.text(count + 0.1, i, f'{count} ({item["Процент"]:.1f}%)', 
                    va='center', ha='left', fontweight='bold', fontsize=10)
         
+        ax.set_xlim(0, max(counts) * 1.15)
         ax.set_xlabel('Количество ошибок')
         ax.set_title('Приоритеты исправления ошибок классификации\n(проценты от общего числа диалогов)', 
                     fontsize=14, fontweight='bold', pad=20)
         
-        legend_elements = [
-            plt.Rectangle((0,0),1,1, fc=self.pastel_colors[0], alpha=0.8, label='Критический (≥5%)'),
-            plt.Rectangle((0,0),1,1, fc=self.pastel_colors[1], alpha=0.8, label='Высокий (2-5%)'),
-            plt.Rectangle((0,0),1,1, fc=self.pastel_colors[2], alpha=0.8, label='Средний (1-2%)'),
-            plt.Rectangle((0,0),1,1, fc=self.pastel_colors[4], alpha=0.8, label='Низкий (<1%)')
-        ]
+        from matplotlib.patches import Rectangle
+        
+        legend_elements = [Rectangle((0,0),1,1, fc=color, alpha=0.8, label=label) for _, color, label in self._priority_legend()]
         ax.legend(handles=legend_elements, loc='upper right', framealpha=0.9)
+    
+    def _priority_legend(self, levels=PRIORITY_LEVELS, colors=PRIORITY_COLORS):
+        legend = []
+        for i, (threshold, level) in enumerate(levels):
+            if len(levels) == 1:
+                label = level
+            elif i == 0:
+                label = f"{level} (≥{threshold:g}%)"
+            elif i == len(levels) - 1:
+                label = f"{level} (<{levels[i - 1][0]:g}%)"
+            else:
+                label = f"{level} ({threshold:g}-{levels[i - 1][0]:g}%)"
+            legend.append((level, colors[i % len(colors)], label))
+        return legend
+        
+    def create_all_charts(self, errors_df, total_dialogs, category_counts=None):
+        tasks = {'accuracy_analysis': lambda: self.create_accuracy_analysis_chart(errors_df, total_dialogs)}
+        
+        if not errors_df.empty:
+            tasks['error_priority'] = lambda: self.create_error_priority_chart(errors_df, total_dialogs,
+                                                                               category_counts=category_counts)
+        
+        self.charts_skipped = 0
+        charts = {name: task() for name, task in tasks.items()}
+        
+        if self.charts_skipped:
+            print(f"Графики без изменений, повторная отрисовка пропущена: {self.charts_skipped}")
+        
+        return charts
+    
+    def _apply_style(self):
+        if not self._style_applied:
+            _load_matplotlib().style.use('default')
+            self.set_elegant_style()
+            self._style_applied = True
+    
+    def _render(self, name, data, draw, figsize, save_path):
+        if self.mode == 'fast':
+            return self._render_fast(name, data, draw, figsize, save_path)
+        
+        self._apply_style()
+        import matplotlib.pyplot as plt
+        
+        fig, ax = plt.subplots(figsize=figsize)
+        draw(ax, data)
         
         plt.tight_layout()
-        plt.savefig(save_path, dpi=300, bbox_inches='tight', facecolor='#FAFAFA')
-        plt.close()
+        plt.savefig(save_path, dpi=self.dpi, bbox_inches='tight', facecolor='#FAFAFA')
+        plt.close(fig)
         
         return save_path
 
-    def create_all_charts(self, errors_df, total_dialogs):
-        charts = {}
+    def _render_fast(self, name, data, draw, figsize, save_path):
+        save_path = f"{os.path.splitext(save_path)[0]}.{self.chart_format}"
+        content_hash = self._content_hash(name, data, figsize)
         
-        charts['accuracy_analysis'] = self.create_accuracy_analysis_chart(errors_df, total_dialogs)
+        if os.path.exists(save_path) and self._load_chart_cache().get(os.path.abspath(save_path)) == content_hash:
+            self.charts_skipped += 1
+            return save_path
         
-        if not errors_df.empty:
-            charts['error_priority'] = self.create_error_priority_chart(errors_df, total_dialogs)
+        self._apply_style()
+        from matplotlib.figure import Figure
         
-        return charts
\ No newline at end of file
+        fig = Figure(figsize=figsize, layout='constrained')
+        draw(fig.add_subplot(), data)
+        fig.savefig(save_path, dpi=self.dpi, format=self.chart_format, facecolor='#FAFAFA')
+        
+        self._store_chart_hash(save_path, content_hash)
+        return save_path
+    
+    def _content_hash(self, name, data, figsize):
+        content = json.dumps({
+            'chart': name,
+            'data': data,
+            'figsize': figsize,
+            'dpi': self.dpi,
+            'format': self.chart_format,
+            'colors': self.pastel_colors,
+            'matplotlib': version('matplotlib')
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
+    def _load_chart_cache(self):
+        try:
+            with open(CHART_CACHE_FILE, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _store_chart_hash(self, save_path, content_hash):
+        chart_cache = self._load_chart_cache()
+        chart_cache[os.path.abspath(save_path)] = content_hash
+        
+        if os.path.dirname(CHART_CACHE_FILE):
+            os.makedirs(os.path.dirname(CHART_CACHE_FILE), exist_ok=True)
+        with open(f"{CHART_CACHE_FILE}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(chart_cache, f, ensure_ascii=False, indent=2)
+        os.replace(f"{CHART_CACHE_FILE}.tmp", CHART_CACHE_FILE)
+
+
+def _load_matplotlib():
+    import matplotlib
+    import matplotlib.style
+    
+    matplotlib.use('Agg')
+    return matplotlib